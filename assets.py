@@ -0,0 +1,63 @@
+# assets.py
+"""Fonts and music, loaded on a background thread so the first frame is not held up."""
+import sys
+import threading
+import time
+import pygame
+
+MUSIC_PATH = "empressoflight.mp3"
+MUSIC_VOLUME = 0.5
+
+# name -> (face, size); all bold.
+FONT_SPECS = {
+    'score': ("Arial", 48),
+    'title': ("Arial", 40),
+    'goal': ("Arial", 36),
+    'win': ("Arial", 36),
+}
+
+class AssetLoader:
+    """Loads the HUD fonts, then (unless audio is off) starts the music.
+
+    fonts stays None until fonts_ready is set; done is set once everything,
+    audio included, has finished or failed. timings holds seconds per phase.
+    """
+    def __init__(self, audio=True, music_path=MUSIC_PATH):
+        self.audio = audio
+        self.music_path = music_path
+        self.fonts = None
+        self.timings = {}
+        self.fonts_ready = threading.Event()
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._load, name="asset-loader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def wait_fonts(self, timeout=None):
+        self.fonts_ready.wait(timeout)
+        return self.fonts
+
+    def _load(self):
+        try:
+            start = time.perf_counter()
+            self.fonts = {name: pygame.font.SysFont(face, size, bold=True)
+                          for name, (face, size) in FONT_SPECS.items()}
+            self.timings['fonts'] = time.perf_counter() - start
+            self.fonts_ready.set()
+            if self.audio:
+                start = time.perf_counter()
+                try:
+                    pygame.mixer.init()
+                    pygame.mixer.music.load(self.music_path)
+                    pygame.mixer.music.set_volume(MUSIC_VOLUME)
+                    pygame.mixer.music.play(-1)
+                except pygame.error as e:
+                    print(f"Audio disabled: {e}", file=sys.stderr)
+                self.timings['audio'] = time.perf_counter() - start
+            print("Assets loaded: " + ", ".join(f"{k} {v:.2f}s" for k, v in self.timings.items()),
+                  file=sys.stderr)
+        finally:
+            self.fonts_ready.set()
+            self.done.set()
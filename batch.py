@@ -0,0 +1,361 @@
+# batch.py
+import numpy as np
+from config import MIN_POS, MAX_POS, WINNING_LENGTH, MAX_GREEN_FOOD, MAX_ORANGE_FOOD, MAX_PURPLE_FOOD
+from snake import BODY_CAPACITY
+
+# Same order as Snake.change_direction's possible_directions.
+DIRECTIONS = np.array([[1, 0, 0], [-1, 0, 0],
+                       [0, 1, 0], [0, -1, 0],
+                       [0, 0, 1], [0, 0, -1]], dtype=np.int16)
+
+# Voxel grid channels: per-cell segment counts for each snake, then food counts by type.
+RED, BLUE, GREEN, ORANGE, PURPLE = range(5)
+NUM_CHANNELS = 5
+
+# Food slots: all green slots first, then orange, then purple.
+FOOD_KINDS = np.array([GREEN] * MAX_GREEN_FOOD + [ORANGE] * MAX_ORANGE_FOOD + [PURPLE] * MAX_PURPLE_FOOD)
+NUM_FOOD_SLOTS = len(FOOD_KINDS)
+
+START_POSITIONS = np.array([[0, 0, 0], [2, 2, 2]], dtype=np.int16)
+NO_WINNER = -1
+BIG = np.iinfo(np.int32).max
+# Random cells tried per spawn before falling back to listing a game's free cells.
+SPAWN_TRIES = 16
+
+class BatchSim:
+    """N independent two-snake matches stored as NumPy structure-of-arrays.
+
+    Each step() advances every unfinished game at once with the rules from
+    GameState.step(): greedy change_direction scoring (normal and boost
+    mode), move() with its out-of-bounds and blocked fallbacks, food pickup
+    thresholds, orange spawns every 2 green eaten, purple spawns on a length
+    gap > 3 and the boosted triple move. Food spawns on a uniformly random
+    cell holding neither a segment nor other food, as in GameState. Games are
+    independent of each other but not bit-identical to GameState, since the
+    random streams differ.
+    """
+    def __init__(self, num_games, seed=None, min_pos=MIN_POS, max_pos=MAX_POS):
+        self.num_games = num_games
+        self.min_pos = min_pos
+        self.max_pos = max_pos
+        self.size = max_pos - min_pos + 1
+        n, s = num_games, self.size
+        self.grid = np.zeros((n, NUM_CHANNELS, s, s, s), dtype=np.uint8)
+        self.body = np.zeros((n, 2, BODY_CAPACITY, 3), dtype=np.int16)
+        self.head = np.zeros((n, 2), dtype=np.int32)
+        self.length = np.zeros((n, 2), dtype=np.int32)
+        self.direction = np.zeros((n, 2, 3), dtype=np.int16)
+        self.grow_count = np.zeros((n, 2), dtype=np.int32)
+        self.boost_timer = np.zeros((n, 2), dtype=np.int32)
+        self.food_pos = np.zeros((n, NUM_FOOD_SLOTS, 3), dtype=np.int16)
+        self.food_alive = np.zeros((n, NUM_FOOD_SLOTS), dtype=bool)
+        self.green_food_eaten = np.zeros(n, dtype=np.int32)
+        self.purple_cooldown = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int32)
+        self.winner = np.zeros(n, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+        # Statistics: food eaten by [snake, GREEN/ORANGE/PURPLE] and boost activations.
+        self.food_eaten = np.zeros((n, 2, 3), dtype=np.int32)
+        self.boosts = np.zeros((n, 2), dtype=np.int32)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        """Start all games over from the initial position."""
+        self.rng = np.random.default_rng(seed)
+        self.reset_games(np.arange(self.num_games))
+
+    def reset_games(self, g):
+        """Start games g over from the initial position; the others carry on."""
+        for arr in (self.grid, self.body, self.head, self.length, self.grow_count, self.boost_timer,
+                    self.food_alive, self.green_food_eaten, self.purple_cooldown, self.ticks,
+                    self.food_eaten, self.boosts):
+            arr[g] = 0
+        self.winner[g] = NO_WINNER
+        self.done[g] = False
+        n = len(g)
+        for s in (RED, BLUE):
+            self.body[g, s, 0] = START_POSITIONS[s]
+            self.length[g, s] = 1
+            x, y, z = START_POSITIONS[s] - self.min_pos
+            self.grid[g, s, x, y, z] = 1
+            self.direction[g, s] = DIRECTIONS[self.rng.integers(0, 6, size=n)]
+        green = np.flatnonzero(FOOD_KINDS == GREEN)
+        for slot in green:
+            self._spawn(g, np.full(n, slot))
+
+    @property
+    def active(self):
+        return ~self.done
+
+    def heads(self, g, s):
+        return self.body[g, s, self.head[g, s]]
+
+    def _cells(self, pos):
+        """Grid indices for in-bounds positions of shape (..., 3)."""
+        c = pos - self.min_pos
+        return c[..., 0], c[..., 1], c[..., 2]
+
+    def _in_bounds(self, pos):
+        return ((pos >= self.min_pos) & (pos <= self.max_pos)).all(axis=-1)
+
+    def _spawn(self, g, slots):
+        """Place food in the given (game, slot) pairs at uniformly random free cells."""
+        # A game may get several foods at once; place them in rounds of distinct
+        # games so each round sees the food placed by the one before.
+        order = np.argsort(g, kind='stable')
+        sorted_g = g[order]
+        i = np.arange(len(g))
+        first = np.maximum.accumulate(np.where(np.r_[True, sorted_g[1:] != sorted_g[:-1]], i, 0))
+        rank = np.empty(len(g), dtype=np.intp)
+        rank[order] = i - first
+        for r in range(rank.max() + 1 if len(g) else 0):
+            sel = rank == r
+            self._place(g[sel], slots[sel])
+
+    def _place(self, g, slots):
+        """_spawn for distinct games g."""
+        pos = self._free_cells(g)
+        self.food_pos[g, slots] = pos
+        self.food_alive[g, slots] = True
+        self.grid[(g, FOOD_KINDS[slots]) + self._cells(pos)] += 1
+
+    def _free_cells(self, g):
+        """A uniformly random cell per game in g with no segment or food; any cell if a game has none."""
+        s = self.size
+        cells = np.zeros((len(g), 3), dtype=np.int16)
+        todo = np.arange(len(g))
+        # Rejection sampling is exactly uniform over the free cells and cheap
+        # unless the arena is nearly full.
+        for _ in range(SPAWN_TRIES):
+            c = self.rng.integers(0, s, size=(len(todo), 3))
+            busy = self.grid[g[todo], :, c[:, 0], c[:, 1], c[:, 2]].any(axis=1)
+            cells[todo[~busy]] = c[~busy]
+            todo = todo[busy]
+            if not len(todo):
+                break
+        for i in todo:
+            free = np.flatnonzero(~self.grid[g[i]].any(axis=0))
+            cell = self.rng.choice(free) if len(free) else self.rng.integers(0, s ** 3)
+            cells[i] = np.unravel_index(cell, (s, s, s))
+        return cells + self.min_pos
+
+    def _despawn(self, g, slots):
+        self.food_alive[g, slots] = False
+        np.add.at(self.grid, (g, FOOD_KINDS[slots]) + self._cells(self.food_pos[g, slots]), -1)
+
+    def _fill_slots(self, g, kind, count):
+        """Spawn up to count[i] foods of kind into the free slots of game g[i]."""
+        slots = np.flatnonzero(FOOD_KINDS == kind)
+        free = ~self.food_alive[g][:, slots]
+        want = free & (np.cumsum(free, axis=1) <= count[:, None])
+        rows, cols = np.nonzero(want)
+        if len(rows):
+            self._spawn(g[rows], slots[cols])
+
+    def _nearest(self, d2, alive, kind):
+        """Slot of the nearest alive food of kind per row, and whether one exists."""
+        d = np.where(alive & (FOOD_KINDS == kind), d2, BIG)
+        slot = d.argmin(axis=1)
+        return slot, d[np.arange(len(d)), slot] < BIG
+
+    def _decide(self, g, s):
+        """Vectorized Snake.change_direction for snake s in games g."""
+        if len(g) == 0:
+            return
+        o = 1 - s
+        m = len(g)
+        rows = np.arange(m)
+        head = self.heads(g, s).astype(np.int32)
+        direction = self.direction[g, s]
+
+        cand = head[:, None, :] + DIRECTIONS
+        inb = self._in_bounds(cand)
+        cx, cy, cz = self._cells(np.clip(cand, self.min_pos, self.max_pos))
+        gg = g[:, None]
+        occupied = inb & ((self.grid[gg, s, cx, cy, cz] > 0) | (self.grid[gg, o, cx, cy, cz] > 0))
+
+        fpos = self.food_pos[g].astype(np.int32)
+        alive = self.food_alive[g]
+        d2 = ((fpos - head[:, None, :]) ** 2).sum(axis=2)
+        p_slot, has_p = self._nearest(d2, alive, PURPLE)
+        o_slot, has_o = self._nearest(d2, alive, ORANGE)
+        g_slot, has_g = self._nearest(d2, alive, GREEN)
+        boosting = self.boost_timer[g, s] > 0
+
+        # Normal mode target priority: purple when behind by 3+, then orange, then green.
+        want_p = has_p & (self.length[g, s] + 3 <= self.length[g, o]) & ~boosting
+        slot = np.where(want_p, p_slot, np.where(has_o, o_slot, g_slot))
+        has_target = want_p | has_o | has_g
+        target = fpos[rows, slot]
+        vec = (target - head).astype(np.float64)
+        dist = np.sqrt((vec ** 2).sum(axis=1))
+        unit = np.divide(vec, dist[:, None], out=vec.copy(), where=dist[:, None] != 0)
+
+        # NORMAL MODE: alignment with the target minus a turning penalty.
+        same = (DIRECTIONS[None, :, :] == direction[:, None, :]).all(axis=2)
+        penalty = np.where((dist[:, None] < 1.5) | same, 0.0, 0.5)
+        score = unit @ DIRECTIONS.T.astype(np.float64) - penalty
+        score[occupied] = -np.inf
+        best = score.argmax(axis=1)
+        normal_ok = has_target & ~occupied.all(axis=1)
+
+        # BOOST MODE: step along the largest-gap axis that is free, else the free
+        # direction closest to the target by Manhattan distance.
+        diff = target - head
+        order = np.argsort(-np.abs(diff), axis=1, kind='stable')
+        axis_idx = 2 * order + (np.take_along_axis(diff, order, axis=1) <= 0)
+        free = inb & ~occupied
+        cand_free = free[rows[:, None], axis_idx]
+        first = axis_idx[rows, cand_free.argmax(axis=1)]
+        l1 = np.abs(target[:, None, :] - cand).sum(axis=2)
+        fallback = np.where(free, l1, BIG).argmin(axis=1)
+        boost_choice = np.where(cand_free.any(axis=1), first, np.where(free.any(axis=1), fallback, -1))
+        boost_ok = has_target & (diff != 0).any(axis=1) & (boost_choice >= 0)
+
+        choice = np.where(boosting, boost_choice, best)
+        ok = np.where(boosting, boost_ok, normal_ok)
+        self.direction[g[ok], s] = DIRECTIONS[choice[ok]]
+
+    def _move(self, g, s):
+        """Vectorized Snake.move for snake s in games g."""
+        if len(g) == 0:
+            return
+        o = 1 - s
+        head = self.heads(g, s)
+        new = head + self.direction[g, s]
+
+        # Off the arena: pick a random in-bounds direction.
+        oob = np.flatnonzero(~self._in_bounds(new))
+        if len(oob):
+            valid = self._in_bounds(head[oob, None, :] + DIRECTIONS)
+            r = (self.rng.random(len(oob)) * valid.sum(axis=1)).astype(np.int64)
+            pick = (np.cumsum(valid, axis=1) > r[:, None]).argmax(axis=1)
+            self.direction[g[oob], s] = DIRECTIONS[pick]
+            new[oob] = head[oob] + DIRECTIONS[pick]
+
+        # Onto the other snake: stay in place.
+        blocked = self.grid[(g, o) + self._cells(new)] > 0
+        new[blocked] = head[blocked]
+
+        cap = BODY_CAPACITY
+        hi = (self.head[g, s] - 1) % cap
+        self.head[g, s] = hi
+        self.body[g, s, hi] = new
+        self.length[g, s] += 1
+        self.grid[(g, s) + self._cells(new)] += 1
+
+        growing = self.grow_count[g, s] > 0
+        self.grow_count[g[growing], s] -= 1
+        pg = g[~growing]
+        self.length[pg, s] -= 1
+        tail = self.body[pg, s, (self.head[pg, s] + self.length[pg, s]) % cap]
+        self.grid[(pg, s) + self._cells(tail)] -= 1
+
+    def _eat(self, g):
+        """Resolve head/food collisions in the order main.py checks them."""
+        slots_by_kind = {kind: np.flatnonzero(FOOD_KINDS == kind) for kind in (GREEN, ORANGE, PURPLE)}
+        heads = [self.heads(g, s).astype(np.int32) for s in (RED, BLUE)]
+        # Distance < 0.5 means the same cell; < 1.5 means squared distance <= 2.
+        thresh = [np.where(self.boost_timer[g, s] > 0, 2.25, 0.25) for s in (RED, BLUE)]
+
+        def eaters(kind):
+            slots = slots_by_kind[kind]
+            fpos = self.food_pos[g][:, slots].astype(np.int32)
+            alive = self.food_alive[g][:, slots]
+            near = [alive & (((fpos - heads[s][:, None, :]) ** 2).sum(axis=2) < thresh[s][:, None])
+                    for s in (RED, BLUE)]
+            return slots, near[0], near[1] & ~near[0]
+
+        slots, by_red, by_blue = eaters(GREEN)
+        eaten = by_red | by_blue
+        for s, by in ((RED, by_red), (BLUE, by_blue)):
+            count = by.sum(axis=1)
+            self.grow_count[g, s] += count
+            self.food_eaten[g, s, 0] += count
+        rows, cols = np.nonzero(eaten)
+        self._despawn(g[rows], slots[cols])
+        before = self.green_food_eaten[g]
+        after = before + eaten.sum(axis=1)
+        self.green_food_eaten[g] = after
+        # One orange per even green_food_eaten value crossed, while slots are free.
+        self._fill_slots(g, ORANGE, after // 2 - before // 2)
+
+        slots, by_red, by_blue = eaters(ORANGE)
+        for s, by in ((RED, by_red), (BLUE, by_blue)):
+            count = by.sum(axis=1)
+            self.grow_count[g, s] += 3 * count
+            self.food_eaten[g, s, 1] += count
+        rows, cols = np.nonzero(by_red | by_blue)
+        self._despawn(g[rows], slots[cols])
+
+        slots, by_red, by_blue = eaters(PURPLE)
+        for s, by in ((RED, by_red), (BLUE, by_blue)):
+            hit = by.any(axis=1)
+            self.boost_timer[g[hit], s] = 30
+            self.food_eaten[g, s, 2] += by.sum(axis=1)
+            self.boosts[g[hit], s] += 1
+        rows, cols = np.nonzero(by_red | by_blue)
+        self._despawn(g[rows], slots[cols])
+
+    def step(self, actions=None):
+        """Advance every unfinished game by one tick. Returns the number still running.
+
+        actions optionally holds a DIRECTIONS index per game for the red
+        snake, replacing its greedy steering.
+        """
+        g = np.flatnonzero(~self.done)
+        if len(g) == 0:
+            return 0
+        self.ticks[g] += 1
+        self.purple_cooldown[g] = np.maximum(self.purple_cooldown[g] - 1, 0)
+
+        if actions is None:
+            self._decide(g, RED)
+        else:
+            self.direction[g, RED] = DIRECTIONS[np.asarray(actions)[g]]
+        self._decide(g, BLUE)
+        self._move(g, RED)
+        self._move(g, BLUE)
+        self._eat(g)
+
+        # Spawn purple food based on length difference.
+        no_purple = ~self.food_alive[g][:, FOOD_KINDS == PURPLE].any(axis=1)
+        gap = np.abs(self.length[g, RED] - self.length[g, BLUE]) > 3
+        spawn = gap & no_purple & (self.purple_cooldown[g] <= 0)
+        self._fill_slots(g[spawn], PURPLE, np.ones(spawn.sum(), dtype=np.int64))
+        self.purple_cooldown[g[spawn]] = 50
+
+        # Ensure there is always enough green food.
+        self._fill_slots(g, GREEN, np.full(len(g), MAX_GREEN_FOOD))
+
+        # If a snake is boosted, move it an extra two times.
+        for s in (RED, BLUE):
+            boosted = g[self.boost_timer[g, s] > 0]
+            self._move(boosted, s)
+            self._move(boosted, s)
+            self.boost_timer[boosted, s] -= 1
+
+        # Check for a win.
+        red_won = self.length[g, RED] >= WINNING_LENGTH
+        blue_won = ~red_won & (self.length[g, BLUE] >= WINNING_LENGTH)
+        self.winner[g[red_won]] = RED
+        self.winner[g[blue_won]] = BLUE
+        self.done[g[red_won | blue_won]] = True
+        return int((~self.done).sum())
+
+    def run(self, max_ticks=10000):
+        """Step until every game has a winner or max_ticks is reached (those end with NO_WINNER)."""
+        while self.step():
+            if self.ticks.max() >= max_ticks:
+                self.done[:] = True
+        return self.results()
+
+    def results(self):
+        """Per-game outcome arrays."""
+        return {
+            'winner': self.winner.copy(),
+            'ticks': self.ticks.copy(),
+            'length': self.length.copy(),
+            'food_eaten': self.food_eaten.copy(),
+            'boosts': self.boosts.copy(),
+        }
@@ -0,0 +1,239 @@
+# bench.py
+"""Micro-benchmarks for the simulation, AI and render hot paths.
+
+    python bench.py                                # run, print a report
+    python bench.py --save bench_baseline.json     # record a baseline
+    python bench.py --baseline bench_baseline.json --threshold 0.25
+
+Every scenario is seeded, so runs are comparable. Each op is timed on its own
+to report percentiles. With --baseline, the run fails (exit status 1) if any
+scenario's median latency is more than --threshold slower than the baseline.
+--render adds a full-frame scenario drawn through an offscreen OSMesa or EGL
+context; it needs no window.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from config import MIN_POS, MAX_POS, WINNING_LENGTH
+from food import spawn_green_food, spawn_orange_food, spawn_purple_food
+
+DEFAULT_OPS = 2000
+WARMUP_OPS = 50
+RENDER_OPS = 100
+
+def midgame(seed, ticks=200):
+    """A seeded GameState advanced past the opening."""
+    from game import GameState
+    state = GameState(seed=seed)
+    for _ in range(ticks):
+        state.step()
+    return state
+
+def long_body(length=WINNING_LENGTH - 5, z=MIN_POS):
+    """A snake body snaking back and forth across the z plane, head first."""
+    cells = []
+    for i, x in enumerate(range(MIN_POS, MAX_POS + 1)):
+        ys = range(MIN_POS, MAX_POS + 1) if i % 2 == 0 else range(MAX_POS, MIN_POS - 1, -1)
+        cells.extend((x, y, z) for y in ys)
+    return np.array(cells[:length][::-1])
+
+# A scenario takes a seed and returns (op, prepare): op is timed on each call,
+# prepare (or None) runs untimed before it.
+
+def change_direction_normal(seed):
+    state = midgame(seed)
+    snake, other = state.snake1, state.snake2
+    snake.speed_boost_timer = 0
+    def op():
+        state.foods.measure([snake.body[0], other.body[0]])
+        snake.change_direction(other, state.foods)
+    return op, None
+
+def change_direction_boost(seed):
+    state = midgame(seed)
+    snake, other = state.snake1, state.snake2
+    def prepare():
+        snake.speed_boost_timer = 30
+    def op():
+        state.foods.measure([snake.body[0], other.body[0]])
+        snake.change_direction(other, state.foods)
+    return op, prepare
+
+def move_long_snake(seed):
+    state = midgame(seed, ticks=0)
+    snake, other = state.snake1, state.snake2
+    body = long_body()
+    moves = [0]
+    def prepare():
+        # Restart from the long body every so often so it stays near WINNING_LENGTH.
+        if moves[0] % 50 == 0:
+            snake.set_body(body)
+            snake.grow_count = 0
+        moves[0] += 1
+        state.foods.measure([snake.body[0], other.body[0]])
+        snake.change_direction(other, state.foods)
+    def op():
+        snake.move(other)
+    return op, prepare
+
+def eat_food(seed):
+    """The per-tick food collision check (GameState._eat_food, formerly inline in main.py)."""
+    state = midgame(seed)
+    start = state.snapshot()
+    def prepare():
+        state.step()
+        if state.winner is not None:
+            state.restore(start)
+    def op():
+        state.foods.measure([state.snake1.body[0], state.snake2.body[0]])
+        state._eat_food()
+    return op, prepare
+
+def spawn_food(seed):
+    """Spawning into a midgame arena through its free-cell index."""
+    state = midgame(seed)
+    rng = random.Random(seed)
+    spawners = (spawn_green_food, spawn_orange_food, spawn_purple_food)
+    count = [0]
+    def op():
+        spawners[count[0] % 3](rng, state.bounds, state.grid)
+        count[0] += 1
+    return op, None
+
+def clone_state(seed):
+    state = midgame(seed)
+    return state.clone, None
+
+def clone_long_snakes(seed):
+    """clone() with both snakes near WINNING_LENGTH; should cost the same as clone_state."""
+    state = midgame(seed, ticks=0)
+    state.snake1.set_body(long_body(z=MIN_POS))
+    state.snake2.set_body(long_body(z=MAX_POS))
+    return state.clone, None
+
+def snapshot_restore(seed):
+    state = midgame(seed)
+    snapshot = state.snapshot()
+    def op():
+        state.snapshot(snapshot)
+        state.restore(snapshot)
+    return op, None
+
+def render_frame(seed):
+    """Draw a full frame (arena, snakes, food, HUD) into an offscreen context."""
+    import pygame
+    import graphics
+    from OpenGL.GL import glFinish
+    graphics.setup_gl()
+    graphics.compile_diamond()
+    graphics.compile_cube_list()
+    pygame.font.init()
+    font = pygame.font.Font(None, 48)
+    fonts = {'score': font, 'title': font, 'goal': font, 'win': font}
+    state = midgame(seed, ticks=400)
+    def op():
+        graphics.draw_frame(state, fonts)
+        glFinish()
+    return op, None
+
+SCENARIOS = {
+    'change_direction_normal': change_direction_normal,
+    'change_direction_boost': change_direction_boost,
+    'move_long_snake': move_long_snake,
+    'eat_food': eat_food,
+    'spawn_food': spawn_food,
+    'clone_state': clone_state,
+    'clone_long_snakes': clone_long_snakes,
+    'snapshot_restore': snapshot_restore,
+}
+
+def run_scenario(factory, seed, ops):
+    op, prepare = factory(seed)
+    timer = time.perf_counter_ns
+    for _ in range(WARMUP_OPS):
+        if prepare is not None:
+            prepare()
+        op()
+    samples = np.empty(ops, dtype=np.int64)
+    for i in range(ops):
+        if prepare is not None:
+            prepare()
+        start = timer()
+        op()
+        samples[i] = timer() - start
+    micros = samples / 1000.0
+    p50, p90, p99 = np.percentile(micros, [50, 90, 99])
+    return {
+        'ops': ops,
+        'ops_per_sec': ops / (samples.sum() / 1e9),
+        'p50_us': float(p50),
+        'p90_us': float(p90),
+        'p99_us': float(p99),
+        'max_us': float(micros.max()),
+    }
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages for scenarios slower than baseline by more than threshold."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        ratio = result['p50_us'] / base['p50_us']
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: p50 {result['p50_us']:.1f}us vs baseline "
+                               f"{base['p50_us']:.1f}us ({ratio - 1:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths.")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS) + ['render_frame'],
+                        help="run only this scenario (repeatable)")
+    parser.add_argument('--ops', type=int, default=DEFAULT_OPS, help="timed ops per scenario")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--render', action='store_true', help="also benchmark offscreen frame rendering")
+    parser.add_argument('--backend', choices=('egl', 'osmesa'), default='egl', help="offscreen GL backend")
+    parser.add_argument('--save', metavar='PATH', help="write the results as a baseline")
+    parser.add_argument('--baseline', metavar='PATH', help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed median slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    names = args.scenario or list(SCENARIOS)
+    if args.render and 'render_frame' not in names:
+        names.append('render_frame')
+    context = None
+    if 'render_frame' in names:
+        # Must happen before graphics (and so OpenGL) is first imported.
+        import offscreen
+        offscreen.select_backend(args.backend)
+        context = offscreen.OffscreenContext(backend=args.backend)
+
+    results = {}
+    for name in names:
+        factory = render_frame if name == 'render_frame' else SCENARIOS[name]
+        ops = min(args.ops, RENDER_OPS) if name == 'render_frame' else args.ops
+        results[name] = result = run_scenario(factory, args.seed, ops)
+        print(f"{name:26s} {result['ops_per_sec']:12.0f} ops/s   p50 {result['p50_us']:9.1f}us"
+              f"   p90 {result['p90_us']:9.1f}us   p99 {result['p99_us']:9.1f}us")
+    if context is not None:
+        context.close()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions.")
+
+if __name__ == "__main__":
+    main()
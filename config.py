@@ -5,6 +5,9 @@ MAX_POS = GRID_SIZE // 2 - 1
 
 WINNING_LENGTH = 100
 
+# Headless matches that run this long without a winner are draws.
+MAX_TICKS = 10000
+
 # Maximum iterations to avoid infinite loops in movement checks.
 MAX_ITER = 10
 
@@ -0,0 +1,164 @@
+# env.py
+"""Reinforcement-learning environments over the game rules, Gym-style.
+
+The agent steers the red snake against an AI-controlled blue one. An action
+is an index into DIRECTIONS, and reset/step follow the Gym API without
+depending on it:
+
+    env = VectorSnakeEnv(1024, seed=0)
+    obs, info = env.reset()
+    obs, rewards, terminated, truncated, info = env.step(actions)
+
+Observations are uint8 voxel tensors of shape (NUM_CHANNELS, size, size,
+size), indexed by cell - min_pos, counting per cell the agent's segments, the
+opponent's segments and green, orange and purple food. They are preallocated
+and updated in place on every step, touching only the cells that changed
+(SnakeEnv follows its match as an observer; the vectorized one is BatchSim's
+own grid), so copy one to keep it.
+
+Each step rewards the cells the agent grew, plus WIN_REWARD for winning or
+minus it for losing. Episodes are truncated after max_ticks.
+"""
+from collections import deque
+
+import numpy as np
+
+from batch import BatchSim, DIRECTIONS, NUM_CHANNELS, RED, BLUE, GREEN
+from config import GRID_SIZE, MAX_TICKS
+
+WIN_REWARD = 10.0
+NUM_ACTIONS = len(DIRECTIONS)
+# Directions as Snake.change_direction builds them.
+ACTIONS = DIRECTIONS.astype(int)
+
+class ActionController:
+    """Snake controller that steers wherever the latest action says."""
+    def __init__(self):
+        self.direction = None
+
+    def choose(self, snake, other, foods):
+        return self.direction
+
+class SnakeEnv:
+    """One match on GameState, exactly as main.py plays it.
+
+    This is the compatibility path: full game rules and any opponent AI, at
+    the speed of GameState.step (a few thousand steps a second, nearly all
+    of it simulation). For training throughput use VectorSnakeEnv, which
+    steps hundreds of thousands of environments a second.
+
+    opponent is one of game.AI_NAMES for the blue snake. The env observes
+    its match, applying each head move, tail pop and food spawn or eat to
+    the observation as it happens; bodies mirrors the snakes (in observation
+    cells, head first) so the popped tails are known.
+    """
+    def __init__(self, opponent='greedy', grid_size=GRID_SIZE, max_ticks=MAX_TICKS):
+        from grid import bounds_for
+        self.opponent = opponent
+        self.grid_size = grid_size
+        self.max_ticks = max_ticks
+        lo, hi = bounds_for(grid_size)
+        size = hi - lo + 1
+        self.observation = np.zeros((NUM_CHANNELS, size, size, size), dtype=np.uint8)
+        self.control = ActionController()
+        self.state = None
+        self.bodies = []
+
+    def reset(self, seed=None):
+        from game import GameState
+        self.state = GameState(seed=seed, ai=('greedy', self.opponent), grid_size=self.grid_size)
+        self.state.snake1.controller = self.control
+        self.state.observers.append(self)
+        self._observe()
+        return self.observation, {}
+
+    def step(self, action):
+        state = self.state
+        agent = state.snake1
+        length = len(agent.body)
+        self.control.direction = ACTIONS[action]
+        terminated = not state.step()
+        reward = float(len(agent.body) - length)
+        if terminated:
+            won = state.winner == f"{state.names[0]} Snake Won!"
+            reward += WIN_REWARD if won else -WIN_REWARD
+        truncated = not terminated and state.ticks >= self.max_ticks
+        info = {'ticks': state.ticks, 'lengths': (len(agent.body), len(state.snake2.body))}
+        return self.observation, reward, terminated, truncated, info
+
+    def _observe(self):
+        """Build the whole observation from the match, at reset."""
+        state = self.state
+        grid = state.grid
+        obs = self.observation
+        obs.fill(0)
+        for channel, snake in ((RED, state.snake1), (BLUE, state.snake2)):
+            np.copyto(obs[channel], grid.counts, casting='unsafe', where=grid.owner == snake.id)
+        foods = state.foods
+        n = len(foods)
+        cells = foods.positions[:n] - grid.min_pos
+        np.add.at(obs, (foods.kinds[:n] + GREEN, cells[:, 0], cells[:, 1], cells[:, 2]), 1)
+        self.bodies = [deque(map(tuple, (snake.body.array() - grid.min_pos).tolist())) for snake in state.snakes]
+
+    def on_move(self, snake, step, grew):
+        body = self.bodies[snake.id]
+        x, y, z = body[0]
+        head = (x + int(step[0]), y + int(step[1]), z + int(step[2]))
+        body.appendleft(head)
+        # Snake ids are the RED and BLUE channels.
+        channel = self.observation[snake.id]
+        channel[head] += 1
+        if not grew:
+            channel[body.pop()] -= 1
+
+    def on_spawn(self, food):
+        self.observation[(food.kind + GREEN,) + self.state.grid.index(food.position)] += 1
+
+    def on_eat(self, index, food):
+        self.observation[(food.kind + GREEN,) + self.state.grid.index(food.position)] -= 1
+
+    def on_boost(self, snake):
+        pass
+
+    def on_tick(self, state):
+        pass
+
+class VectorSnakeEnv:
+    """num_envs matches stepped together on BatchSim, with greedy blue snakes.
+
+    Finished matches restart on the step they end, so observations always
+    show running games; terminated and truncated say which ones just ended.
+    The returned arrays are reused from step to step.
+    """
+    def __init__(self, num_envs, seed=None, max_ticks=MAX_TICKS):
+        self.num_envs = num_envs
+        self.max_ticks = max_ticks
+        self.sim = BatchSim(num_envs, seed)
+        # BatchSim's channels are red, blue, green, orange, purple: already agent-first.
+        self.observations = self.sim.grid
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+        self._lengths = np.zeros(num_envs, dtype=np.int32)
+
+    def reset(self, seed=None):
+        self.sim.reset(seed)
+        return self.observations, {}
+
+    def step(self, actions):
+        sim = self.sim
+        np.copyto(self._lengths, sim.length[:, RED])
+        sim.step(actions)
+        rewards = self.rewards
+        np.subtract(sim.length[:, RED], self._lengths, out=rewards, casting='unsafe')
+        rewards[sim.winner == RED] += WIN_REWARD
+        rewards[sim.winner == BLUE] -= WIN_REWARD
+        np.copyto(self.terminated, sim.done)
+        np.greater_equal(sim.ticks, self.max_ticks, out=self.truncated)
+        self.truncated &= ~self.terminated
+        finished = np.flatnonzero(self.terminated | self.truncated)
+        info = {}
+        if len(finished):
+            info['final_ticks'] = sim.ticks[finished]
+            sim.reset_games(finished)
+        return self.observations, rewards, self.terminated, self.truncated, info
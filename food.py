@@ -1,20 +1,34 @@
 # food.py
 import random
 import numpy as np
-from config import MIN_POS, MAX_POS
-from graphics import diamond_list, draw_diamond
+from config import MIN_POS, MAX_POS, MAX_GREEN_FOOD, MAX_ORANGE_FOOD, MAX_PURPLE_FOOD
+
+# Food types, as stored in FoodIndex.kinds.
+GREEN, ORANGE, PURPLE = 0, 1, 2
+FOOD_COLORS = ('green', 'orange', 'purple')
+FOOD_RGB = np.array([(0, 1, 0), (1, 0.5, 0), (0.5, 0, 0.5)], dtype=np.float32)
 
 class Food:
-    def __init__(self, bonus=False, color=None):
-        self.position = self.generate_food_position()
+    def __init__(self, bonus=False, color=None, rng=None, position=None, bounds=(MIN_POS, MAX_POS), grid=None):
+        if position is None:
+            position = self.generate_food_position(rng if rng is not None else random, bounds, grid)
+        self.position = np.asarray(position)
         self.bonus = bonus
         self.color = color if color is not None else ('orange' if bonus else 'green')
+        self.kind = FOOD_COLORS.index(self.color)
     
-    def generate_food_position(self):
-        return np.array([random.randint(MIN_POS, MAX_POS) for _ in range(3)])
+    def generate_food_position(self, rng=random, bounds=(MIN_POS, MAX_POS), grid=None):
+        """A random cell; with an OccupancyGrid, a random one free of snakes and food."""
+        if grid is not None:
+            position = grid.sample_free(rng)
+            if position is not None:
+                return position
+        return np.array([rng.randint(*bounds) for _ in range(3)])
     
     def draw(self):
         from OpenGL.GL import glColor3f, glPushMatrix, glTranslatef, glCallList, glPopMatrix
+        # Import graphics lazily so the simulation can run without OpenGL.
+        from graphics import diamond_list, draw_diamond
         if self.color == 'green':
             glColor3f(0, 1, 0)
         elif self.color == 'orange':
@@ -29,11 +43,104 @@ class Food:
             draw_diamond(0.3)
         glPopMatrix()
 
-def spawn_green_food():
-    return Food(bonus=False)
+def spawn_green_food(rng=None, bounds=(MIN_POS, MAX_POS), grid=None):
+    return Food(bonus=False, rng=rng, bounds=bounds, grid=grid)
+
+def spawn_orange_food(rng=None, bounds=(MIN_POS, MAX_POS), grid=None):
+    return Food(bonus=True, rng=rng, bounds=bounds, grid=grid)
+
+def spawn_purple_food(rng=None, bounds=(MIN_POS, MAX_POS), grid=None):
+    return Food(bonus=False, color='purple', rng=rng, bounds=bounds, grid=grid)
+
+class FoodIndex:
+    """All food in a match, with positions and types kept in contiguous arrays.
+
+    Foods stay in spawn order (removal shifts, it does not swap) so that
+    nearest-food ties and eat order match the per-type lists this replaces.
+    Distances from the snake heads are computed in one vectorized query and
+    cached until the heads or the food change. With a grid, each food is
+    also marked in it, so the grid knows which cells are free.
+    """
+    def __init__(self, capacity=MAX_GREEN_FOOD + MAX_ORANGE_FOOD + MAX_PURPLE_FOOD, grid=None):
+        self.grid = grid
+        self.items = []
+        self.positions = np.zeros((capacity, 3), dtype=np.int32)
+        self.kinds = np.zeros(capacity, dtype=np.int8)
+        # GameState fixes the arrays in its record, so they must not be reallocated.
+        self.resizable = True
+        self._heads = None
+        self._dist = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, food):
+        n = len(self.items)
+        if n == len(self.positions):
+            if not self.resizable:
+                raise ValueError(f"FoodIndex is full ({n} foods) and fixed in a GameState")
+            self.positions = np.concatenate([self.positions, np.zeros_like(self.positions)])
+            self.kinds = np.concatenate([self.kinds, np.zeros_like(self.kinds)])
+        self.positions[n] = food.position
+        self.kinds[n] = food.kind
+        self.items.append(food)
+        if self.grid is not None:
+            self.grid.add_food(food.position)
+        self._dist = None
+
+    def remove(self, food):
+        """Remove food and return the index it had."""
+        i = next(i for i, item in enumerate(self.items) if item is food)
+        n = len(self.items)
+        self.positions[i:n - 1] = self.positions[i + 1:n]
+        self.kinds[i:n - 1] = self.kinds[i + 1:n]
+        del self.items[i]
+        if self.grid is not None:
+            self.grid.remove_food(food.position)
+        self._dist = None
+        return i
+
+    def count(self, kind):
+        n = len(self.items)
+        return int(np.count_nonzero(self.kinds[:n] == kind))
+
+    def measure(self, heads):
+        """Return the (len(heads), len(self)) matrix of head-to-food distances."""
+        heads = np.asarray(heads)
+        if self._dist is not None and self._heads.shape == heads.shape and (self._heads == heads).all():
+            return self._dist
+        n = len(self.items)
+        diff = self.positions[None, :n] - heads[:, None]
+        self._heads = heads
+        self._dist = np.sqrt((diff * diff).sum(axis=2))
+        return self._dist
+
+    def _distances(self, head):
+        if self._dist is not None:
+            for i, cached in enumerate(self._heads):
+                if (cached == head).all():
+                    return self._dist[i]
+        return self.measure([head])[0]
+
+    def nearest(self, head, kind):
+        """Return the food of kind closest to head (earliest spawned on ties), or None."""
+        n = len(self.items)
+        mask = self.kinds[:n] == kind
+        if not mask.any():
+            return None
+        d = np.where(mask, self._distances(head), np.inf)
+        return self.items[int(d.argmin())]
 
-def spawn_orange_food():
-    return Food(bonus=True)
+    def eaten_by(self, heads, thresholds, kind):
+        """List (food, head index) for foods of kind within the head's threshold.
 
-def spawn_purple_food():
-    return Food(bonus=False, color='purple')
+        A food within reach of several heads goes to the first one.
+        """
+        n = len(self.items)
+        within = self.measure(heads) < np.asarray(thresholds)[:, None]
+        hit = within.any(axis=0) & (self.kinds[:n] == kind)
+        eater = within.argmax(axis=0)
+        return [(self.items[i], int(eater[i])) for i in np.flatnonzero(hit)]
@@ -0,0 +1,426 @@
+# game.py
+import array
+import copy
+import random
+import struct
+import numpy as np
+from config import GRID_SIZE, WINNING_LENGTH, MAX_GREEN_FOOD, MAX_ORANGE_FOOD, MAX_PURPLE_FOOD
+from food import GREEN, ORANGE, PURPLE, FOOD_COLORS, Food, FoodIndex, \
+                 spawn_green_food, spawn_orange_food, spawn_purple_food
+from snake import BODY_CAPACITY, Snake
+from grid import OccupancyGrid, bounds_for
+from pathfinding import DistanceField, PathfindingAI
+from search import SearchAI
+
+# Snake AIs selectable by name. "greedy" is Snake.change_direction's built-in steering.
+AI_NAMES = ('greedy', 'bfs', 'search')
+
+# Node budget per decision for the "search" AI. A node budget rather than a
+# time budget keeps seeded matches reproducible on any machine.
+SEARCH_NODES = 2000
+
+# Name and color of each snake, in start order. The first two are the
+# original red and blue snakes.
+SNAKES = (
+    ("Red", (1, 0, 0)), ("Blue", (0, 0, 1)), ("Yellow", (1, 1, 0)), ("White", (1, 1, 1)),
+    ("Pink", (1, 0.4, 0.7)), ("Teal", (0, 0.6, 0.6)), ("Brown", (0.6, 0.35, 0.1)), ("Lime", (0.6, 1, 0.2)),
+    ("Navy", (0.1, 0.1, 0.5)), ("Maroon", (0.5, 0, 0.1)), ("Olive", (0.5, 0.5, 0)), ("Silver", (0.7, 0.7, 0.7)),
+    ("Coral", (1, 0.5, 0.4)), ("Indigo", (0.3, 0, 0.6)), ("Gold", (0.85, 0.65, 0.1)), ("Sky", (0.4, 0.7, 1)),
+)
+MAX_SNAKES = len(SNAKES)
+
+# to_bytes() header: magic, format version, snake count, grid size, green food
+# and the length of the comma-separated AI names that follow it.
+SNAPSHOT_HEADER = struct.Struct('<4sBBHHB')
+SNAPSHOT_MAGIC = b'SNKS'
+SNAPSHOT_VERSION = 1
+
+class GameState:
+    """Headless match simulation: snakes, food and win detection, with no rendering or audio.
+
+    All randomness comes from the match's own random.Random, seeded with
+    seed, or from the random module when there is none. The same seed always
+    replays the same match, and restoring a snapshot never touches any other
+    generator. ai is one of AI_NAMES for every snake, or a sequence with one
+    name per snake.
+
+    num_snakes (up to MAX_SNAKES) snakes play in an arena of grid_size, laid
+    out like config.GRID_SIZE. Collisions go through the shared OccupancyGrid,
+    so a tick costs about the same whatever the snakes' lengths. Each snake
+    steers against a rival, the nearest other head; with two snakes that is
+    simply the other one.
+
+    Objects in observers are told about every change as it happens:
+    on_move(snake, delta, grew), on_spawn(food), on_eat(index, food),
+    on_boost(snake) and on_tick(state) at the end of each tick.
+
+    Every array of the match (grid, free cells, food, snake bodies) is a view
+    into one NumPy structured record, so snapshot() is a single flat uint8
+    copy of it and restore() copies one back in place, whatever the snakes'
+    lengths. The remaining scalars and the random state ride along in the
+    same record. The bound arrays cannot be reallocated: a snake outgrowing
+    BODY_CAPACITY or food overfilling its slots raises there and then.
+    """
+    def __init__(self, seed=None, ai='greedy', num_snakes=2, grid_size=GRID_SIZE, green_food=MAX_GREEN_FOOD):
+        if not 1 <= num_snakes <= MAX_SNAKES:
+            raise ValueError(f"num_snakes must be between 1 and {MAX_SNAKES}")
+        self.seed = seed
+        self.rng = random.Random(seed if seed is not None else random.getrandbits(64))
+        self.bounds = bounds_for(grid_size)
+        self.green_food = green_food
+        self.grid = OccupancyGrid(*self.bounds)
+        self.foods = FoodIndex(green_food + MAX_ORANGE_FOOD + MAX_PURPLE_FOOD, grid=self.grid)
+        self.field = None
+        ais = [ai] * num_snakes if isinstance(ai, str) else list(ai)
+        if len(ais) != num_snakes:
+            raise ValueError(f"Expected {num_snakes} AI names, got {len(ais)}")
+        self.ais = ais
+        self.snakes = []
+        self.names = []
+        for i, (name, color) in enumerate(SNAKES[:num_snakes]):
+            if i == 0:
+                start = [0, 0, 0]
+            elif i == 1:
+                start = [2, 2, 2]
+            else:
+                start = self._free_cell()
+            self.snakes.append(Snake(color, start, self.grid, self.rng, self._controller(ais[i])))
+            self.names.append(name)
+        # Food goes down after the snakes, so none starts under one.
+        for _ in range(green_food):
+            self.foods.add(spawn_green_food(self.rng, self.bounds, self.grid))
+        self.green_food_eaten = 0
+        self.purple_cooldown = 0
+        self.ticks = 0
+        self.winner = None
+        # Match statistics, indexed by snake id.
+        self.food_eaten = {'green': [0] * num_snakes, 'orange': [0] * num_snakes, 'purple': [0] * num_snakes}
+        self.boost_ticks = [0] * num_snakes
+        self.observers = []
+        # Optional profiler.Profiler; step() times its phases when one is set.
+        self.profiler = None
+        # Optional pipeline.AIPipeline; step() takes the snakes' decisions from it when set.
+        self.planner = None
+        record = np.zeros((), dtype=self._layout())
+        for view, owner, attr in self._arrays(record):
+            view[...] = getattr(owner, attr)
+        self._bind(record)
+
+    def _layout(self):
+        n, s = len(self.snakes), self.grid.size
+        cells = (s, s, s)
+        return np.dtype([
+            ('ticks', np.int64), ('green_food_eaten', np.int64), ('purple_cooldown', np.int64),
+            ('winner', np.int64), ('free_count', np.int64), ('food_count', np.int64),
+            ('heads', np.int64, n), ('lengths', np.int64, n), ('grow', np.int64, n),
+            ('boost', np.int64, n), ('directions', np.int64, (n, 3)),
+            ('food_eaten', np.int64, (3, n)), ('boost_ticks', np.int64, n),
+            ('rng_state', np.uint32, 625), ('rng_gauss', np.float64),
+            ('bodies', np.int32, (n, BODY_CAPACITY, 3)),
+            ('food_positions', np.int32, self.foods.positions.shape), ('food_kinds', np.int8, len(self.foods.kinds)),
+            ('grid_counts', np.uint16, cells), ('grid_owner', np.int8, cells), ('grid_food', np.uint8, cells),
+            ('free_cells', np.int32, s ** 3), ('free_slot', np.int32, s ** 3),
+        ])
+
+    def _arrays(self, record):
+        """(view into record, object, attribute) for every array that lives in the record."""
+        grid, foods = self.grid, self.foods
+        yield record['grid_counts'], grid, 'counts'
+        yield record['grid_owner'], grid, 'owner'
+        yield record['grid_food'], grid, 'food'
+        yield record['free_cells'], grid.free, 'cells'
+        yield record['free_slot'], grid.free, 'slot'
+        yield record['food_positions'], foods, 'positions'
+        yield record['food_kinds'], foods, 'kinds'
+        for snake, body in zip(self.snakes, record['bodies']):
+            yield body, snake, '_buf'
+
+    def _bind(self, record):
+        """Point every array of the match at its view into record."""
+        self._record = record
+        # Copying the record as raw bytes is one memcpy; copying it as a structured array goes field by field.
+        self._bytes = record.reshape(1).view(np.uint8)
+        for view, owner, attr in self._arrays(record):
+            setattr(owner, attr, view)
+        self.foods.resizable = False
+        for snake in self.snakes:
+            snake.resizable = False
+
+    def _store(self):
+        """Write the match's scalars into the record."""
+        r = self._record
+        snakes = self.snakes
+        r['ticks'] = self.ticks
+        r['green_food_eaten'] = self.green_food_eaten
+        r['purple_cooldown'] = self.purple_cooldown
+        r['winner'] = -1 if self.winner is None else self.names.index(self.winner.split()[0])
+        r['free_count'] = self.grid.free.count
+        r['food_count'] = len(self.foods)
+        for i, snake in enumerate(snakes):
+            r['heads'][i] = snake._head
+            r['lengths'][i] = snake._length
+            r['grow'][i] = snake.grow_count
+            r['boost'][i] = snake.speed_boost_timer
+            r['directions'][i] = snake.direction
+        r['food_eaten'] = [self.food_eaten[color] for color in FOOD_COLORS]
+        r['boost_ticks'] = self.boost_ticks
+        _, internal, gauss = self.rng.getstate()
+        r['rng_state'] = np.frombuffer(array.array('I', internal), dtype=np.uint32)
+        r['rng_gauss'] = np.nan if gauss is None else gauss
+
+    def _load(self):
+        """Set the match's scalars, food objects and random state from the record."""
+        r = self._record
+        self.ticks = int(r['ticks'])
+        self.green_food_eaten = int(r['green_food_eaten'])
+        self.purple_cooldown = int(r['purple_cooldown'])
+        winner = int(r['winner'])
+        self.winner = None if winner < 0 else f"{self.names[winner]} Snake Won!"
+        self.grid.free.count = int(r['free_count'])
+        for i, snake in enumerate(self.snakes):
+            snake._head = int(r['heads'][i])
+            snake._length = int(r['lengths'][i])
+            snake.grow_count = int(r['grow'][i])
+            snake.speed_boost_timer = int(r['boost'][i])
+            snake.direction = r['directions'][i].copy()
+        for color, counts in zip(FOOD_COLORS, r['food_eaten'].tolist()):
+            self.food_eaten[color] = counts
+        self.boost_ticks = r['boost_ticks'].tolist()
+        foods = self.foods
+        n = int(r['food_count'])
+        foods.items = [Food(color=FOOD_COLORS[kind], position=position)
+                       for kind, position in zip(foods.kinds[:n].tolist(), foods.positions[:n].copy())]
+        foods._dist = None
+        gauss = float(r['rng_gauss'])
+        self.rng.setstate((3, tuple(r['rng_state'].tolist()), None if np.isnan(gauss) else gauss))
+
+    def snapshot(self, out=None):
+        """The whole match as one flat uint8 array; out, if given, is reused."""
+        self._store()
+        if out is None:
+            return self._bytes.copy()
+        np.copyto(out, self._bytes)
+        return out
+
+    def restore(self, snapshot):
+        """Return in place to a snapshot (any bytes-like) of this match or one with the same settings.
+
+        Observers are not told; controllers see the change on their next decision.
+        """
+        data = np.frombuffer(snapshot, dtype=np.uint8)
+        if len(data) != len(self._bytes):
+            raise ValueError("Snapshot is from a match with different settings")
+        np.copyto(self._bytes, data)
+        self._load()
+        if self.field is not None:
+            self.field.invalidate()
+
+    def clone(self):
+        """An independent copy of the match, with fresh controllers and no observers, profiler or planner."""
+        self._store()
+        other = copy.copy(self)
+        other.grid = copy.copy(self.grid)
+        other.grid.free = copy.copy(self.grid.free)
+        # A fresh distance field starts its own change log if a controller needs one.
+        other.grid.changes = None
+        other.foods = copy.copy(self.foods)
+        other.foods.grid = other.grid
+        other.field = None
+        other.snakes = []
+        for snake, ai in zip(self.snakes, self.ais):
+            twin = copy.copy(snake)
+            twin.body = type(snake.body)(twin)
+            twin.grid = other.grid
+            twin.controller = other._controller(ai)
+            other.snakes.append(twin)
+        other.rng = random.Random()
+        for snake in other.snakes:
+            snake.rng = other.rng
+        other.food_eaten = dict(self.food_eaten)
+        other.observers = []
+        other.profiler = None
+        other.planner = None
+        other._bind(self._bytes.copy().view(self._record.dtype).reshape(()))
+        other._load()
+        return other
+
+    def to_bytes(self):
+        """The match as bytes: a short settings header and then the snapshot record."""
+        ais = ','.join(self.ais).encode()
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.snakes), self.grid.size + 1,
+                                      self.green_food, len(ais))
+        return header + ais + self.snapshot().tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a match saved with to_bytes."""
+        magic, version, num_snakes, grid_size, green_food, ai_length = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a game snapshot, or one from another version")
+        offset = SNAPSHOT_HEADER.size
+        ais = bytes(data[offset:offset + ai_length]).decode().split(',')
+        state = cls(seed=0, ai=ais, num_snakes=num_snakes, grid_size=grid_size, green_food=green_food)
+        state.seed = None
+        state.restore(memoryview(data)[offset + ai_length:])
+        return state
+
+    @property
+    def snake1(self):
+        return self.snakes[0]
+
+    @property
+    def snake2(self):
+        return self.snakes[1]
+
+    def _free_cell(self):
+        return self.grid.sample_free(self.rng)
+
+    def rival(self, snake):
+        """The snake whose head is nearest (Manhattan) to snake's head; earlier snakes win ties."""
+        snakes = self.snakes
+        if len(snakes) == 2:
+            return snakes[1] if snake is snakes[0] else snakes[0]
+        head = snake.body[0]
+        best, best_distance = snake, None
+        for other in snakes:
+            if other is snake:
+                continue
+            distance = int(np.abs(other.body[0] - head).sum())
+            if best_distance is None or distance < best_distance:
+                best, best_distance = other, distance
+        return best
+
+    def _controller(self, name):
+        if name == 'greedy':
+            return None
+        if name == 'bfs':
+            # One distance field per match, shared by every snake that uses it.
+            if self.field is None:
+                self.field = DistanceField(self.grid, self.foods)
+            return PathfindingAI(self.field)
+        if name == 'search':
+            return SearchAI(time_budget=None, max_nodes=SEARCH_NODES)
+        raise ValueError(f"Unknown AI {name!r}; expected one of {AI_NAMES}")
+
+    @property
+    def running(self):
+        return self.winner is None
+
+    def step(self):
+        """Advance the match by one tick. Returns True while the match is still running."""
+        if self.winner is not None:
+            return False
+        self.ticks += 1
+        if self.purple_cooldown > 0:
+            self.purple_cooldown -= 1
+
+        snakes = self.snakes
+        foods = self.foods
+        rivals = [self.rival(snake) for snake in snakes]
+
+        # Have each snake decide a new direction and then move. All share one
+        # distance query against the current heads.
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.restart()
+        foods.measure([snake.body[0] for snake in snakes])
+        if self.planner is None:
+            for snake, rival in zip(snakes, rivals):
+                snake.change_direction(rival, foods)
+        else:
+            self.planner.decide(self, rivals)
+        if profiler is not None:
+            profiler.mark('ai')
+        for snake, rival in zip(snakes, rivals):
+            self._move(snake, rival)
+        if profiler is not None:
+            profiler.mark('move')
+
+        self._eat_food()
+        if profiler is not None:
+            profiler.mark('food')
+
+        # Spawn purple food based on length difference.
+        lengths = [len(snake.body) for snake in snakes]
+        if max(lengths) - min(lengths) > 3 and not foods.count(PURPLE) and self.purple_cooldown <= 0:
+            self._add_food(spawn_purple_food(self.rng, self.bounds, self.grid))
+            self.purple_cooldown = 50
+
+        # Ensure there is always enough green food.
+        for _ in range(self.green_food - foods.count(GREEN)):
+            self._add_food(spawn_green_food(self.rng, self.bounds, self.grid))
+        if profiler is not None:
+            profiler.mark('spawn')
+
+        # If a snake is boosted, move it an extra time.
+        for snake, rival in zip(snakes, rivals):
+            if snake.speed_boost_timer > 0:
+                for _ in range(2):
+                    self._move(snake, rival)
+                snake.speed_boost_timer -= 1
+                self.boost_ticks[snake.id] += 1
+        if profiler is not None:
+            profiler.mark('move')
+            profiler.end_tick(self.ticks)
+
+        # Check for a win.
+        for snake, name in zip(snakes, self.names):
+            if len(snake.body) >= WINNING_LENGTH:
+                self.winner = f"{name} Snake Won!"
+                break
+        if self.planner is not None and self.winner is None:
+            # Next tick's decisions are computed while the caller renders this one.
+            self.planner.submit(self)
+        for observer in self.observers:
+            observer.on_tick(self)
+        return self.winner is None
+
+    def _move(self, snake, other):
+        step, grew = snake.move(other)
+        for observer in self.observers:
+            observer.on_move(snake, step, grew)
+
+    def _add_food(self, food):
+        self.foods.add(food)
+        for observer in self.observers:
+            observer.on_spawn(food)
+
+    def _remove_food(self, food):
+        index = self.foods.remove(food)
+        for observer in self.observers:
+            observer.on_eat(index, food)
+
+    def _eat_food(self):
+        """Resolve head/food collisions for this tick."""
+        snakes = self.snakes
+        foods = self.foods
+        heads = [snake.body[0] for snake in snakes]
+
+        # Set thresholds for food collision.
+        thresholds = [1.5 if snake.speed_boost_timer > 0 else 0.5 for snake in snakes]
+
+        # Check for collisions with green food.
+        for food, i in foods.eaten_by(heads, thresholds, GREEN):
+            snake = snakes[i]
+            snake.grow()
+            self.food_eaten['green'][snake.id] += 1
+            self._remove_food(food)
+            self.green_food_eaten += 1
+            if self.green_food_eaten % 2 == 0 and foods.count(ORANGE) < MAX_ORANGE_FOOD:
+                self._add_food(spawn_orange_food(self.rng, self.bounds, self.grid))
+
+        # Check for collisions with orange food, including any spawned just above.
+        for food, i in foods.eaten_by(heads, thresholds, ORANGE):
+            snake = snakes[i]
+            snake.grow(3)
+            self.food_eaten['orange'][snake.id] += 1
+            self._remove_food(food)
+
+        # Check for collisions with purple food.
+        for food, i in foods.eaten_by(heads, thresholds, PURPLE):
+            snake = snakes[i]
+            snake.speed_boost_timer = 30
+            self.food_eaten['purple'][snake.id] += 1
+            self._remove_food(food)
+            for observer in self.observers:
+                observer.on_boost(snake)
@@ -1,8 +1,10 @@
 # graphics.py
 import time
+import ctypes
+from collections import OrderedDict
 import pygame
 import numpy as np
-from math import pi, cos, sin
+from math import pi, cos, sin, tan, radians
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from config import GRID_SIZE, DISPLAY_SIZE
@@ -10,6 +12,24 @@ from config import GRID_SIZE, DISPLAY_SIZE
 # Global variables to hold display lists.
 diamond_list = None
 cube_list = None
+# Grid size the arena cube was compiled for, and the size HUD text is laid out in.
+arena_size = GRID_SIZE
+viewport_size = DISPLAY_SIZE
+# Vertical field of view, and the camera's distance from the arena center, set by setup_gl.
+FIELD_OF_VIEW = 45
+camera_distance = 40.0
+
+# Snake segment tessellations from nearest to farthest; segments beyond the
+# last level are drawn as points. Level i ends LOD_OFFSETS[i] arena sizes
+# past the arena center, so by default the near half is at full detail.
+LOD_SEGMENTS = (6, 4, 3)
+LOD_OFFSETS = np.array([0.0, 0.2, 0.4])
+
+# Batched drawing: unit meshes built once, and a streaming vertex buffer that
+# holds every instance of a frame (None until first use, False if unavailable).
+_meshes = {}
+_batch_vbo = None
+_batch_scratch = np.empty((0, 9), dtype=np.float32)
 
 def draw_diamond(size=0.3):
     """Draw an octahedron that represents a food item."""
@@ -54,9 +74,9 @@ def compile_diamond():
         print("Display lists not available for diamond; using immediate mode.")
         diamond_list = None
 
-def compile_cube():
+def compile_cube(grid_size=GRID_SIZE):
     """Draw the arena cube with white, thick borders."""
-    size = GRID_SIZE // 2
+    size = grid_size // 2
     vertices = [
         [-size, -size, -size],
         [ size, -size, -size],
@@ -83,15 +103,19 @@ def compile_cube():
             glVertex3fv(vertices[vertex])
     glEnd()
 
-def compile_cube_list():
+def compile_cube_list(grid_size=GRID_SIZE):
     """Compile a display list for the arena cube if possible."""
-    global cube_list
+    global cube_list, arena_size
+    arena_size = grid_size
+    if cube_list is not None:
+        # Recompiling for a new arena size.
+        glDeleteLists(cube_list, 1)
     try:
         cube_list = glGenLists(1)
         if cube_list == 0:
             raise Exception("glGenLists returned 0")
         glNewList(cube_list, GL_COMPILE)
-        compile_cube()
+        compile_cube(grid_size)
         glEndList()
     except Exception as e:
         print("Display lists not available for cube; using immediate mode.")
@@ -106,7 +130,7 @@ def draw_arena():
     if cube_list is not None:
         glCallList(cube_list)
     else:
-        compile_cube_list()
+        compile_cube_list(arena_size)
     glPopAttrib()
 
 def draw_cube():
@@ -117,7 +141,7 @@ def draw_cube():
     if cube_list is not None:
         glCallList(cube_list)
     else:
-        compile_cube()
+        compile_cube(arena_size)
     glEnable(GL_LIGHTING)
     glPopAttrib()
 
@@ -141,53 +165,436 @@ def draw_sphere(radius=0.4, segments=6):
             glVertex3f(x * zr1, y * zr1, z1)
         glEnd()
 
+def sphere_mesh(segments=6):
+    """Unit sphere as GL_TRIANGLES (vertices, normals), matching draw_sphere's tessellation."""
+    key = ('sphere', segments)
+    if key not in _meshes:
+        lat = pi * (-0.5 + np.arange(segments + 1) / segments)
+        lng = 2 * pi * np.arange(segments + 1) / segments
+        # Grid of points on the unit sphere: ring i, meridian j.
+        pts = np.stack([np.cos(lng)[None, :] * np.cos(lat)[:, None],
+                        np.sin(lng)[None, :] * np.cos(lat)[:, None],
+                        np.repeat(np.sin(lat)[:, None], segments + 1, axis=1)], axis=-1)
+        i, j = np.meshgrid(np.arange(segments), np.arange(segments), indexing='ij')
+        quads = np.stack([pts[i, j], pts[i + 1, j], pts[i, j + 1],
+                          pts[i, j + 1], pts[i + 1, j], pts[i + 1, j + 1]], axis=2)
+        verts = quads.reshape(-1, 3).astype(np.float32)
+        # On a unit sphere the normal is the position.
+        _meshes[key] = (verts, verts.copy())
+    return _meshes[key]
+
+def diamond_mesh(size=0.3):
+    """The food octahedron as GL_TRIANGLES (vertices, normals), matching draw_diamond."""
+    key = ('diamond', size)
+    if key not in _meshes:
+        v = np.array([[0, 0, size], [size, 0, 0], [0, size, 0],
+                      [-size, 0, 0], [0, -size, 0], [0, 0, -size]], dtype=np.float32)
+        faces = np.array([(0, 1, 2), (0, 2, 3), (0, 3, 4), (0, 4, 1),
+                          (5, 2, 1), (5, 3, 2), (5, 4, 3), (5, 1, 4)])
+        tris = v[faces]
+        n = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+        _meshes[key] = (tris.reshape(-1, 3), np.repeat(n, 3, axis=0).astype(np.float32))
+    return _meshes[key]
+
+def draw_instances(mesh, positions, colors, scales=None):
+    """Draw one mesh at many positions with one glDrawArrays call.
+
+    positions and colors are (n, 3) arrays; scales an optional (n,) array.
+    Fixed-function GL has no instancing, so the instances are expanded into a
+    single interleaved vertex/normal/color array and streamed to a VBO.
+    """
+    global _batch_vbo, _batch_scratch
+    verts, normals = mesh
+    n, v = len(positions), len(verts)
+    if n == 0:
+        return
+    count = n * v
+    if len(_batch_scratch) < count:
+        _batch_scratch = np.empty((count, 9), dtype=np.float32)
+    data = _batch_scratch[:count]
+    out = data.reshape(n, v, 9)
+    positions = np.asarray(positions, dtype=np.float32)
+    if scales is None:
+        out[:, :, 0:3] = verts
+    else:
+        np.multiply(verts[None], np.asarray(scales, dtype=np.float32)[:, None, None], out=out[:, :, 0:3])
+    out[:, :, 0:3] += positions[:, None, :]
+    out[:, :, 3:6] = normals
+    out[:, :, 6:9] = np.asarray(colors, dtype=np.float32)[:, None, :]
+
+    if _batch_vbo is None:
+        try:
+            _batch_vbo = glGenBuffers(1)
+        except Exception:
+            print("Vertex buffers not available; using client-side arrays.")
+            _batch_vbo = False
+    stride = 9 * 4
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    if _batch_vbo:
+        glBindBuffer(GL_ARRAY_BUFFER, _batch_vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, stride, ctypes.c_void_p(12))
+        glColorPointer(3, GL_FLOAT, stride, ctypes.c_void_p(24))
+    else:
+        flat = data.reshape(-1)
+        glVertexPointer(3, GL_FLOAT, stride, flat)
+        glNormalPointer(GL_FLOAT, stride, flat[3:])
+        glColorPointer(3, GL_FLOAT, stride, flat[6:])
+    glDrawArrays(GL_TRIANGLES, 0, count)
+    if _batch_vbo:
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_NORMAL_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+def interpolate_body(previous, current, alpha):
+    """Segment positions a fraction alpha of the way from one tick's body to the next.
+
+    Segment i slides from where it was (previous[i]) to where it is now;
+    segments added by growth have no previous position and sit still.
+    """
+    positions = current.astype(np.float32)
+    n = min(len(previous), len(current))
+    step = current[:n] - previous[:n]
+    # A boosted snake moves at most three cells a tick; anything larger is a
+    # seek or a restart and is drawn without interpolation.
+    if n and np.abs(step).max() <= 3:
+        positions[:n] = previous[:n] + step * alpha
+    return positions
+
+class LevelOfDetail:
+    """Distance thresholds that pick a tessellation for each snake segment.
+
+    A segment nearer the camera than thresholds()[i] is drawn with
+    LOD_SEGMENTS[i]; one beyond every threshold becomes a point. bias, in
+    world units, is added to every threshold; QualityGovernor moves it.
+    Disabled, every segment gets the full-detail sphere.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.bias = 0.0
+
+    def bias_range(self):
+        """Biases at which everything is a point and everything is full detail."""
+        reach = arena_size * 0.87  # Center to corner.
+        return -(reach + arena_size * LOD_OFFSETS[-1]), reach
+
+    def thresholds(self):
+        return camera_distance + arena_size * LOD_OFFSETS + self.bias
+
+    def levels(self, positions):
+        """Level of each world position, len(LOD_SEGMENTS) meaning a point."""
+        if not self.enabled:
+            return np.zeros(len(positions), dtype=np.intp)
+        # Column-major modelview: eye = position @ M[:3, :3] + M[3, :3].
+        m = np.asarray(glGetFloatv(GL_MODELVIEW_MATRIX), dtype=np.float32).reshape(4, 4)
+        eye = positions @ m[:3, :3] + m[3, :3]
+        return np.searchsorted(self.thresholds(), np.sqrt((eye * eye).sum(axis=1)))
+
+lod = LevelOfDetail()
+
+class QualityGovernor:
+    """Moves lod.bias to hold frame times near a target frame rate.
+
+    Feed update() each frame's working time, excluding any frame-cap sleep.
+    While the smoothed time is over budget, the detail thresholds pull in by
+    step world units a frame; once it is comfortably under (headroom of the
+    budget) they ease back out, up to full detail everywhere.
+    """
+    def __init__(self, target_fps=30, step=0.25, smoothing=0.1, headroom=0.8, lod=lod):
+        self.budget_ms = 1000.0 / target_fps
+        self.step = step
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.lod = lod
+        self.average_ms = self.budget_ms
+
+    def update(self, frame_ms):
+        self.average_ms += (frame_ms - self.average_ms) * self.smoothing
+        low, high = self.lod.bias_range()
+        bias = self.lod.bias
+        if self.average_ms > self.budget_ms:
+            bias -= self.step
+        elif self.average_ms < self.budget_ms * self.headroom:
+            bias += self.step
+        self.lod.bias = min(max(bias, low), high)
+
+def draw_points(positions, colors, radius=0.4):
+    """Draw spheres as round, distance-attenuated points: one vertex instead of a mesh each."""
+    # A sphere at eye distance d covers radius * height / (d * tan(fov / 2)) pixels across.
+    size = radius * viewport_size[1] / tan(radians(FIELD_OF_VIEW / 2))
+    glPushAttrib(GL_ENABLE_BIT | GL_POINT_BIT)
+    glDisable(GL_LIGHTING)
+    glEnable(GL_POINT_SMOOTH)
+    glPointParameterfv(GL_POINT_DISTANCE_ATTENUATION, [0.0, 0.0, 1.0])
+    glPointSize(size)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, np.ascontiguousarray(positions, dtype=np.float32))
+    # Unlit, so darken to roughly the shade of a lit sphere.
+    glColorPointer(3, GL_FLOAT, 0, np.ascontiguousarray(colors * 0.6, dtype=np.float32))
+    glDrawArrays(GL_POINTS, 0, len(positions))
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopAttrib()
+
+def draw_snakes(snakes, previous=None, alpha=1.0):
+    """Draw every segment of every snake, batched by level of detail.
+
+    previous optionally holds each snake's body array from the tick before,
+    to draw the snakes alpha of the way between the two ticks.
+    """
+    if previous is None:
+        previous = [None] * len(snakes)
+    pairs = [(snake, prev) for snake, prev in zip(snakes, previous) if len(snake.body)]
+    if not pairs:
+        return
+    snakes = [snake for snake, _ in pairs]
+    positions = np.concatenate([
+        snake.body.array() if prev is None else interpolate_body(prev, snake.body.array(), alpha)
+        for snake, prev in pairs])
+    colors = np.concatenate([snake.segment_colors() for snake in snakes])
+    radii = np.concatenate([snake.segment_radii() for snake in snakes])
+    levels = lod.levels(positions)
+    for level, segments in enumerate(LOD_SEGMENTS):
+        mask = levels == level
+        if mask.any():
+            draw_instances(sphere_mesh(segments), positions[mask], colors[mask], radii[mask])
+    mask = levels == len(LOD_SEGMENTS)
+    if mask.any():
+        draw_points(positions[mask], colors[mask])
+
+def draw_foods(foods):
+    """Draw all food diamonds in one batch."""
+    foods = list(foods)
+    if not foods:
+        return
+    from food import FOOD_RGB
+    positions = np.array([food.position for food in foods])
+    colors = FOOD_RGB[[food.kind for food in foods]]
+    draw_instances(diamond_mesh(0.3), positions, colors)
+
 # ----- Text Drawing Functions -----
+class TextCache:
+    """Rendered strings kept as GL textures, keyed by (text, font, color).
+
+    A string is rasterized and uploaded once; later draws are one textured
+    quad. Least recently used textures are deleted once capacity is exceeded,
+    so changing strings such as the scores do not pile up.
+    """
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.textures = OrderedDict()
+
+    def get(self, text, font, color):
+        """Return (texture, width, height) for the string, rendering it on a miss."""
+        key = (text, font, tuple(color))
+        entry = self.textures.get(key)
+        if entry is not None:
+            self.textures.move_to_end(key)
+            return entry
+        surf = font.render(text, True, color)
+        data = pygame.image.tostring(surf, "RGBA", True)
+        width, height = surf.get_width(), surf.get_height()
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        entry = (texture, width, height)
+        self.textures[key] = entry
+        while len(self.textures) > self.capacity:
+            _, (old, _, _) = self.textures.popitem(last=False)
+            glDeleteTextures([old])
+        return entry
+
+    def size(self, text, font, color):
+        return self.get(text, font, color)[1:]
+
+    def draw(self, text, x, y, font, color):
+        """Draw the string with its lower-left corner at window pixel (x, y).
+
+        Expects the pixel-aligned orthographic projection the HUD code sets up.
+        """
+        texture, width, height = self.get(text, font, color)
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glColor4f(1, 1, 1, 1)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0); glVertex2f(x, y)
+        glTexCoord2f(1, 0); glVertex2f(x + width, y)
+        glTexCoord2f(1, 1); glVertex2f(x + width, y + height)
+        glTexCoord2f(0, 1); glVertex2f(x, y + height)
+        glEnd()
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glDisable(GL_TEXTURE_2D)
+
+text_cache = TextCache()
+
 def draw_text_top_left(text, x_offset, y_offset, font, color):
-    surf = font.render(text, True, color)
-    data = pygame.image.tostring(surf, "RGBA", True)
+    width, height = text_cache.size(text, font, color)
     x = x_offset
-    y = DISPLAY_SIZE[1] - y_offset - surf.get_height()
-    glWindowPos2d(x, y)
-    glDrawPixels(surf.get_width(), surf.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, data)
+    y = viewport_size[1] - y_offset - height
+    text_cache.draw(text, x, y, font, color)
 
 def draw_text_top_right(text, x_offset, y_offset, font, color):
-    surf = font.render(text, True, color)
-    data = pygame.image.tostring(surf, "RGBA", True)
-    x = DISPLAY_SIZE[0] - x_offset - surf.get_width()
-    y = DISPLAY_SIZE[1] - y_offset - surf.get_height()
-    glWindowPos2d(x, y)
-    glDrawPixels(surf.get_width(), surf.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, data)
+    width, height = text_cache.size(text, font, color)
+    x = viewport_size[0] - x_offset - width
+    y = viewport_size[1] - y_offset - height
+    text_cache.draw(text, x, y, font, color)
 
 def draw_text_top_center(text, y_offset, font, color):
-    surf = font.render(text, True, color)
-    data = pygame.image.tostring(surf, "RGBA", True)
-    x = (DISPLAY_SIZE[0] - surf.get_width()) // 2
-    y = DISPLAY_SIZE[1] - y_offset - surf.get_height()
-    glWindowPos2d(x, y)
-    glDrawPixels(surf.get_width(), surf.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, data)
+    width, height = text_cache.size(text, font, color)
+    x = (viewport_size[0] - width) // 2
+    y = viewport_size[1] - y_offset - height
+    text_cache.draw(text, x, y, font, color)
 
 def draw_text_bottom_center(text, y_offset, font, color):
-    surf = font.render(text, True, color)
-    data = pygame.image.tostring(surf, "RGBA", True)
-    x = (DISPLAY_SIZE[0] - surf.get_width()) // 2
+    width, height = text_cache.size(text, font, color)
+    x = (viewport_size[0] - width) // 2
     y = y_offset
-    glWindowPos2d(x, y)
-    glDrawPixels(surf.get_width(), surf.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, data)
+    text_cache.draw(text, x, y, font, color)
 
 def draw_text_center(text, font, color):
-    surf = font.render(text, True, color)
-    data = pygame.image.tostring(surf, "RGBA", True)
-    x = (DISPLAY_SIZE[0] - surf.get_width()) // 2
-    y = (DISPLAY_SIZE[1] - surf.get_height()) // 2
-    glWindowPos2d(x, y)
-    glDrawPixels(surf.get_width(), surf.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, data)
-
-def init_opengl():
+    width, height = text_cache.size(text, font, color)
+    x = (viewport_size[0] - width) // 2
+    y = (viewport_size[1] - height) // 2
+    text_cache.draw(text, x, y, font, color)
+
+def draw_hud(snakes, names, fonts, message=None):
+    """Scores, legend, title and goal text; message, if given, is drawn in the center.
+
+    fonts maps 'score', 'title', 'goal' and 'win' to pygame fonts.
+    """
+    score_font, title_font, goal_font = fonts['score'], fonts['title'], fonts['goal']
+    # Draw scores, one line per snake in its own color.
+    y_offset = 20
+    for snake, name in zip(snakes, names):
+        score_text = f"{name}: {len(snake.body)}"
+        color = tuple(int(c * 255) for c in snake.color) + (255,)
+        draw_text_top_left(score_text, 20, y_offset, score_font, color)
+        y_offset += score_font.size(score_text)[1] + 10
+
+    # Draw legend with larger, better formatted text.
+    # We'll use score_font (48px) and 60-pixel vertical spacing.
+    legend_x_offset = 10
+    legend_y_offset = 10
+    line_spacing = 60
+    draw_text_top_right("Legend:", legend_x_offset, legend_y_offset, score_font, (255, 255, 255, 255))
+    draw_text_top_right("Green: +1", legend_x_offset, legend_y_offset + line_spacing, score_font, (0, 255, 0, 255))
+    draw_text_top_right("Orange: +3", legend_x_offset, legend_y_offset + 2 * line_spacing, score_font, (255, 165, 0, 255))
+    draw_text_top_right("Purple: BOOST", legend_x_offset, legend_y_offset + 3 * line_spacing, score_font, (128, 0, 128, 255))
+
+    draw_text_top_center("3D Snake Game", 10, title_font, (255, 255, 255, 255))
+    draw_text_bottom_center("Goal: 100", 10, goal_font, (255, 255, 255, 255))
+
+    if message:
+        draw_text_center(message, fonts['win'], (255, 255, 255, 255))
+
+def draw_profile_graph(frames, x=20, y=60, width=480, height=160, budget_ms=1000 / 60):
+    """Stacked bars of per-phase frame times, newest on the right, in window pixels.
+
+    frames is a (n, phases) array of milliseconds (profiler.Profiler.recent());
+    the horizontal line marks budget_ms and sits at two thirds of the height.
+    """
+    from profiler import PHASE_COLORS
+    n, phases = frames.shape
+    if n == 0:
+        return
+    scale = height * 2 / 3 / budget_ms
+    bar = width / n
+    tops = np.cumsum(frames, axis=1) * scale
+    bottoms = tops - frames * scale
+    left = x + np.arange(n, dtype=np.float32)[:, None] * bar
+    # One quad per (frame, phase): four corners, all drawn in a single call.
+    quads = np.empty((n, phases, 4, 2), dtype=np.float32)
+    quads[:, :, 0, 0] = quads[:, :, 3, 0] = left
+    quads[:, :, 1, 0] = quads[:, :, 2, 0] = left + bar
+    quads[:, :, 0, 1] = quads[:, :, 1, 1] = y + np.minimum(bottoms, height)
+    quads[:, :, 2, 1] = quads[:, :, 3, 1] = y + np.minimum(tops, height)
+    colors = np.ascontiguousarray(np.broadcast_to(PHASE_COLORS[:phases, None], (n, phases, 4, 3)))
+
+    glColor4f(0, 0, 0, 0.5)
+    glBegin(GL_QUADS)
+    glVertex2f(x, y); glVertex2f(x + width, y); glVertex2f(x + width, y + height); glVertex2f(x, y + height)
+    glEnd()
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, quads.reshape(-1))
+    glColorPointer(3, GL_FLOAT, 0, colors.reshape(-1))
+    glDrawArrays(GL_QUADS, 0, n * phases * 4)
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glColor3f(1, 1, 1)
+    glBegin(GL_LINES)
+    glVertex2f(x, y + budget_ms * scale); glVertex2f(x + width, y + budget_ms * scale)
+    glEnd()
+
+def draw_frame(state, fonts=None, previous=None, alpha=1.0, message=None, profiler=None):
+    """Draw one frame of a match: arena, snakes, food and, when fonts are loaded, the HUD.
+
+    state is anything with snakes, names and foods (a GameState or a
+    replay); previous and alpha are passed on to draw_snakes. With a
+    profiler, each stage is timed and the frame-time graph is drawn.
+    """
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    draw_arena()
+    if profiler is not None:
+        profiler.mark('arena')
+    draw_snakes(state.snakes, previous, alpha)
+    if profiler is not None:
+        profiler.mark('snakes')
+    draw_foods(state.foods)
+    if profiler is not None:
+        profiler.mark('food_draw')
+
+    # Set up orthographic projection for overlay text.
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    gluOrtho2D(0, viewport_size[0], 0, viewport_size[1])
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+
+    if fonts is not None:
+        draw_hud(state.snakes, state.names, fonts, message)
+    if profiler is not None:
+        draw_profile_graph(profiler.recent())
+        profiler.mark('hud')
+
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+
+def init_opengl(grid_size=GRID_SIZE):
     """Set up OpenGL and Pygame display settings."""
     pygame.init()
     pygame.display.set_caption("3D Snake Game")
     pygame.display.set_mode(DISPLAY_SIZE, pygame.DOUBLEBUF | pygame.OPENGL)
-    
+    setup_gl(grid_size=grid_size)
+
+def setup_gl(size=DISPLAY_SIZE, grid_size=GRID_SIZE):
+    """Set the GL state the game renders with, on whatever context is current.
+
+    The camera backs off in proportion to grid_size so the whole arena fits.
+    """
+    global viewport_size, camera_distance
+    viewport_size = size
+    glViewport(0, 0, size[0], size[1])
     glClearColor(0.1, 0.1, 0.1, 1.0)
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_BLEND)
@@ -195,8 +602,14 @@ def init_opengl():
     glEnable(GL_LINE_SMOOTH)
     glHint(GL_LINE_SMOOTH_HINT, GL_NICEST)
     
-    gluPerspective(45, (DISPLAY_SIZE[0] / DISPLAY_SIZE[1]), 0.1, 100.0)
-    glTranslatef(0.0, 0.0, -40)
+    camera_distance = 40 * grid_size / GRID_SIZE
+    # The projection gets its own stack so the modelview matrix maps world to eye space.
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(FIELD_OF_VIEW, (size[0] / size[1]), 0.1, max(100.0, camera_distance * 2.5))
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glTranslatef(0.0, 0.0, -camera_distance)
     
     glEnable(GL_LIGHTING)
     glEnable(GL_LIGHT0)
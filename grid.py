@@ -0,0 +1,149 @@
+# grid.py
+import numpy as np
+from config import MIN_POS, MAX_POS
+
+EMPTY = -1
+
+def bounds_for(grid_size):
+    """(min_pos, max_pos) of an arena of grid_size, as config derives MIN_POS/MAX_POS from GRID_SIZE."""
+    return -grid_size // 2 + 1, grid_size // 2 - 1
+
+class FreeCells:
+    """A set of flat cell indices with O(1) add, discard and uniform sampling.
+
+    cells[:count] holds the members in no particular order and slot[cell] is
+    a member's place there (-1 if absent); discard moves the last member into
+    the hole it leaves.
+    """
+    def __init__(self, n):
+        self.cells = np.arange(n, dtype=np.int32)
+        self.slot = np.arange(n, dtype=np.int32)
+        self.count = n
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, cell):
+        return self.slot[cell] >= 0
+
+    def add(self, cell):
+        if self.slot[cell] >= 0:
+            return
+        self.cells[self.count] = cell
+        self.slot[cell] = self.count
+        self.count += 1
+
+    def discard(self, cell):
+        i = self.slot[cell]
+        if i < 0:
+            return
+        self.count -= 1
+        last = self.cells[self.count]
+        self.cells[i] = last
+        self.slot[last] = i
+        self.slot[cell] = -1
+
+    def sample(self, rng):
+        return int(self.cells[rng.randrange(self.count)])
+
+class OccupancyGrid:
+    """Voxel occupancy shared by all snakes in a match.
+
+    Every in-bounds cell keeps a segment count and the id of the snake that
+    occupies it, so "is this cell free / whose segment is it" is a single
+    array lookup instead of a scan over every body. Snakes never share a cell
+    (move() refuses to step onto another snake), but a snake may overlap
+    itself, hence the counts.
+
+    Food is counted per cell too, and free tracks the cells holding neither
+    segments nor food, so spawning takes constant time however full the
+    arena is.
+
+    When changes is a list, the flat index of every cell that gains its
+    first segment or loses its last one is appended to it, for whoever
+    keeps a copy of the occupancy (pathfinding.DistanceField) to catch up
+    from; the reader clears it.
+    """
+    def __init__(self, min_pos=MIN_POS, max_pos=MAX_POS):
+        self.min_pos = min_pos
+        self.max_pos = max_pos
+        self.size = max_pos - min_pos + 1
+        shape = (self.size, self.size, self.size)
+        self.counts = np.zeros(shape, dtype=np.uint16)
+        self.owner = np.full(shape, EMPTY, dtype=np.int8)
+        self.food = np.zeros(shape, dtype=np.uint8)
+        self.free = FreeCells(self.size ** 3)
+        self.changes = None
+        self._next_id = 0
+
+    def register(self):
+        """Return a new owner id for a snake joining this grid."""
+        snake_id = self._next_id
+        self._next_id += 1
+        return snake_id
+
+    def in_bounds(self, pos):
+        lo, hi = self.min_pos, self.max_pos
+        return lo <= pos[0] <= hi and lo <= pos[1] <= hi and lo <= pos[2] <= hi
+
+    def index(self, pos):
+        """Array index of an in-bounds position."""
+        lo = self.min_pos
+        return (int(pos[0]) - lo, int(pos[1]) - lo, int(pos[2]) - lo)
+
+    def flat(self, idx):
+        """Flat index (as used by free) of an array index."""
+        return (idx[0] * self.size + idx[1]) * self.size + idx[2]
+
+    def owner_at(self, pos):
+        """Return the id of the snake occupying pos, or EMPTY (also for out-of-bounds cells)."""
+        if not self.in_bounds(pos):
+            return EMPTY
+        return int(self.owner[self.index(pos)])
+
+    def is_free(self, pos):
+        return self.in_bounds(pos) and self.counts[self.index(pos)] == 0
+
+    def add(self, pos, snake_id):
+        """Record a segment of snake_id entering pos."""
+        idx = self.index(pos)
+        if self.counts[idx] == 0:
+            flat = self.flat(idx)
+            self.free.discard(flat)
+            if self.changes is not None:
+                self.changes.append(flat)
+        self.counts[idx] += 1
+        self.owner[idx] = snake_id
+
+    def remove(self, pos):
+        """Record a segment leaving pos."""
+        idx = self.index(pos)
+        self.counts[idx] -= 1
+        if self.counts[idx] == 0:
+            self.owner[idx] = EMPTY
+            flat = self.flat(idx)
+            if self.food[idx] == 0:
+                self.free.add(flat)
+            if self.changes is not None:
+                self.changes.append(flat)
+
+    def add_food(self, pos):
+        idx = self.index(pos)
+        self.food[idx] += 1
+        self.free.discard(self.flat(idx))
+
+    def remove_food(self, pos):
+        idx = self.index(pos)
+        self.food[idx] -= 1
+        if self.food[idx] == 0 and self.counts[idx] == 0:
+            self.free.add(self.flat(idx))
+
+    def sample_free(self, rng):
+        """A uniformly random cell with no segment or food, or None if there is none."""
+        if not len(self.free):
+            return None
+        s = self.size
+        x, rest = divmod(self.free.sample(rng), s * s)
+        y, z = divmod(rest, s)
+        lo = self.min_pos
+        return np.array([x + lo, y + lo, z + lo])
@@ -0,0 +1,187 @@
+# kernels.py
+"""Optional compiled versions of Snake.steer's scoring loops.
+
+Numba is only imported by load(), which Snake.steer calls on its first
+decision, so importing the game costs nothing extra. With Numba installed,
+steer_normal and steer_boost are then compiled on first use and cached on
+disk (in __pycache__), so later runs load them instead of compiling. Without
+Numba, or with SNAKE_JIT=0 in the environment (checked before importing it),
+they stay None and Snake.steer runs its pure-Python loops. Both paths make
+exactly the same choices; test_kernels.py checks this, as does
+
+    python kernels.py --parity --matches 20
+
+The kernels read the OccupancyGrid owner array directly and return an index
+into DIRECTIONS, or -1 to keep the current direction.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from grid import EMPTY
+
+# Same order as Snake.steer's possible_directions: +x, -x, +y, -y, +z, -z.
+DIRECTIONS = np.array([[1, 0, 0], [-1, 0, 0],
+                       [0, 1, 0], [0, -1, 0],
+                       [0, 0, 1], [0, 0, -1]])
+
+def _steer_normal(owner, lo, hi, head, direction, target):
+    """Normal mode: the free direction best aligned with target, with a 0.5 turning penalty.
+
+    Out-of-bounds cells count as free, as in Snake.steer.
+    """
+    vx = target[0] - head[0]
+    vy = target[1] - head[1]
+    vz = target[2] - head[2]
+    distance = np.sqrt(float(vx * vx + vy * vy + vz * vz))
+    if distance != 0:
+        unit = (vx / distance, vy / distance, vz / distance)
+    else:
+        unit = (0.0, 0.0, 0.0)
+    best = -1
+    best_score = -np.inf
+    for k in range(6):
+        axis = k // 2
+        sign = 1 - 2 * (k % 2)
+        x, y, z = head[0], head[1], head[2]
+        if axis == 0:
+            x += sign
+        elif axis == 1:
+            y += sign
+        else:
+            z += sign
+        if lo <= x <= hi and lo <= y <= hi and lo <= z <= hi and owner[x - lo, y - lo, z - lo] != EMPTY:
+            continue
+        penalty = 0.0
+        if distance >= 1.5:
+            same = True
+            for i in range(3):
+                step = sign if i == axis else 0
+                if direction[i] != step:
+                    same = False
+            if not same:
+                penalty = 0.5
+        score = sign * unit[axis] - penalty
+        if score > best_score:
+            best_score = score
+            best = k
+    return best
+
+def _steer_boost(owner, lo, hi, head, target):
+    """Boost mode: along the largest-gap free axis, else the free cell nearest target (L1)."""
+    diff = (target[0] - head[0], target[1] - head[1], target[2] - head[2])
+    if diff[0] == 0 and diff[1] == 0 and diff[2] == 0:
+        return -1
+    # Axes by decreasing gap, ties in axis order (a stable sort of three).
+    order = [0, 1, 2]
+    for i in range(1, 3):
+        j = i
+        while j > 0 and abs(diff[order[j]]) > abs(diff[order[j - 1]]):
+            order[j], order[j - 1] = order[j - 1], order[j]
+            j -= 1
+    for axis in order:
+        k = 2 * axis if diff[axis] > 0 else 2 * axis + 1
+        if _free(owner, lo, hi, head, k):
+            return k
+    best = -1
+    best_l1 = 0
+    for k in range(6):
+        if not _free(owner, lo, hi, head, k):
+            continue
+        axis = k // 2
+        sign = 1 - 2 * (k % 2)
+        l1 = 0
+        for i in range(3):
+            l1 += abs(diff[i] - (sign if i == axis else 0))
+        if best < 0 or l1 < best_l1:
+            best = k
+            best_l1 = l1
+    return best
+
+def _free(owner, lo, hi, head, k):
+    """True if the cell one step from head in DIRECTIONS[k] is in bounds and unoccupied."""
+    axis = k // 2
+    sign = 1 - 2 * (k % 2)
+    x, y, z = head[0], head[1], head[2]
+    if axis == 0:
+        x += sign
+    elif axis == 1:
+        y += sign
+    else:
+        z += sign
+    return lo <= x <= hi and lo <= y <= hi and lo <= z <= hi and owner[x - lo, y - lo, z - lo] == EMPTY
+
+ENABLED = os.environ.get('SNAKE_JIT', '1') != '0'
+numba = None
+steer_normal = steer_boost = None
+loaded = False
+
+def load():
+    """Import Numba and wrap the kernels, once. Returns True if compiled kernels are in use."""
+    global numba, steer_normal, steer_boost, _free, loaded
+    if not loaded:
+        loaded = True
+        if ENABLED:
+            try:
+                import numba
+            except ImportError:
+                numba = None
+        if numba is not None:
+            _free = numba.njit(cache=True)(_free)
+            steer_normal = numba.njit(cache=True)(_steer_normal)
+            steer_boost = numba.njit(cache=True)(_steer_boost)
+    return steer_normal is not None
+
+def trace(seed, ticks, num_snakes):
+    """Each snake's direction and head after every tick of a seeded greedy match."""
+    from game import GameState
+    state = GameState(seed=seed, num_snakes=num_snakes)
+    rows = []
+    while state.ticks < ticks and state.step():
+        rows.append([(tuple(snake.direction), tuple(snake.body[0])) for snake in state.snakes])
+    return rows, state.winner
+
+def parity(seeds, ticks, num_snakes):
+    """Play each seed with the kernels and then without; return the seeds whose matches differ."""
+    # snake.py reads the kernels from the imported module, which is not __main__ when run as a script.
+    import kernels
+    kernels.load()
+    compiled = kernels.steer_normal, kernels.steer_boost
+    # Without Numba, still check the kernels' logic by running them uncompiled.
+    fast = compiled if kernels.steer_normal is not None else (kernels._steer_normal, kernels._steer_boost)
+    mismatches = []
+    try:
+        for seed in seeds:
+            kernels.steer_normal, kernels.steer_boost = fast
+            with_kernels = trace(seed, ticks, num_snakes)
+            kernels.steer_normal = kernels.steer_boost = None
+            if trace(seed, ticks, num_snakes) != with_kernels:
+                mismatches.append(seed)
+    finally:
+        kernels.steer_normal, kernels.steer_boost = compiled
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the compiled steering kernels against pure Python.")
+    parser.add_argument('--parity', action='store_true', help="compare seeded matches with and without kernels")
+    parser.add_argument('--matches', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--snakes', type=int, default=2)
+    parser.add_argument('--ticks', type=int, default=5000, help="stop each match after this many ticks")
+    args = parser.parse_args()
+
+    print("Kernels: " + ("compiled with Numba " + numba.__version__ if load() else
+                         "unavailable, checking them uncompiled"))
+    if not args.parity:
+        return
+    seeds = range(args.seed, args.seed + args.matches)
+    mismatches = parity(seeds, args.ticks, args.snakes)
+    if mismatches:
+        print(f"Decisions differ for seeds {mismatches}")
+        sys.exit(1)
+    print(f"{args.matches} matches identical.")
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,134 @@
 # main.py
-import pygame
 import time
-import numpy as np
+startup_begin = time.perf_counter()
+import argparse
+
+from config import GRID_SIZE, MAX_GREEN_FOOD
+from game import AI_NAMES, MAX_SNAKES, GameState
+from pipeline import MODES, AIPipeline
+
+parser = argparse.ArgumentParser(description="3D Snake Game")
+parser.add_argument('--seed', type=int, default=None, help="seed for a reproducible match")
+parser.add_argument('--record', metavar='PATH', help="record the match to a replay file")
+parser.add_argument('--replay', metavar='PATH', help="play back a recorded match instead of simulating")
+parser.add_argument('--tick-rate', type=float, default=8.0, help="simulation ticks per second")
+parser.add_argument('--speed', type=float, default=1.0, help="multiplier on the tick rate (fast-forward)")
+parser.add_argument('--fps', type=int, default=60, help="render frame cap (0 for uncapped)")
+parser.add_argument('--turbo', type=int, default=0, metavar='N',
+                    help="tick as fast as possible and render only every Nth state")
+parser.add_argument('--countdown', type=float, default=0, metavar='SECONDS',
+                    help="show an in-window countdown before the match starts")
+parser.add_argument('--no-audio', action='store_true', help="never initialize the mixer")
+parser.add_argument('--profile', metavar='PATH',
+                    help="start with the profiler on and stream timings to a .csv or .jsonl file")
+parser.add_argument('--snakes', type=int, default=2, help=f"number of snakes (up to {MAX_SNAKES})")
+parser.add_argument('--arena', type=int, default=GRID_SIZE, help="arena size in cells, e.g. 64")
+parser.add_argument('--ai', choices=AI_NAMES, default='greedy', help="AI for every snake")
+parser.add_argument('--pipeline', choices=MODES,
+                    help="compute AI decisions in a worker thread or process while rendering")
+parser.add_argument('--ai-deadline', type=float, default=100, metavar='MS',
+                    help="with --pipeline, fall back to greedy steering when a decision takes longer")
+parser.add_argument('--target-fps', type=float, default=None, metavar='FPS',
+                    help="lower snake detail to hold this frame rate (default --fps, 0 for fixed detail)")
+parser.add_argument('--no-lod', action='store_true', help="draw every snake segment at full detail")
+parser.add_argument('--serve', type=int, metavar='PORT', help="broadcast the match to spectators on PORT")
+parser.add_argument('--food', type=int, default=MAX_GREEN_FOOD, help="green food kept in the arena")
+args = parser.parse_args()
+if args.tick_rate <= 0:
+    parser.error("--tick-rate must be positive")
+if args.speed <= 0:
+    parser.error("--speed must be positive")
+if args.serve is not None and args.replay:
+    parser.error("--serve cannot broadcast a --replay")
+# Replays and the spectator protocol only carry two snakes.
+if args.snakes != 2 and args.record:
+    parser.error("--record only supports two-snake matches")
+if args.snakes != 2 and args.serve is not None:
+    parser.error("--serve only supports two-snake matches")
+
+# pygame and OpenGL are only imported once the arguments are known to be good.
+import pygame
 from OpenGL.GL import *
 from OpenGL.GLU import *
 
-from config import DISPLAY_SIZE, WINNING_LENGTH, MAX_GREEN_FOOD, MAX_ORANGE_FOOD, MAX_PURPLE_FOOD
-from graphics import init_opengl, compile_diamond, compile_cube_list, draw_arena, \
-                     draw_text_top_left, draw_text_top_right, draw_text_top_center, \
-                     draw_text_bottom_center, draw_text_center
-from food import spawn_green_food, spawn_orange_food, spawn_purple_food
-from snake import Snake
+from config import DISPLAY_SIZE
+from graphics import init_opengl, compile_diamond, compile_cube_list, draw_frame, QualityGovernor, lod, \
+                     draw_text_top_center, draw_text_bottom_center, draw_text_center
+from replay import ReplayRecorder, ReplayPlayer
+from assets import AssetLoader
+from profiler import Profiler
+
+# Seconds spent in each startup phase, reported once the first frame is up.
+startup = {'imports': time.perf_counter() - startup_begin}
+
+# The simulation runs headless; the loop below only handles input and rendering.
+# A replay exposes the same snakes/foods/step() interface without running any AI.
+recorder = None
+if args.replay:
+    state = ReplayPlayer.load(args.replay)
+else:
+    state = GameState(seed=args.seed, ai=args.ai, num_snakes=args.snakes, grid_size=args.arena,
+                      green_food=args.food)
+    if args.pipeline:
+        # Created before any other thread starts, so a worker process forks cleanly.
+        state.planner = AIPipeline(state, args.pipeline, args.ai_deadline / 1000)
+    if args.record:
+        recorder = ReplayRecorder(state)
+        state.observers.append(recorder)
+    if args.serve is not None:
+        from spectator import SpectatorServer, DeltaEncoder
+        state.observers.append(DeltaEncoder(state, SpectatorServer(port=args.serve).start_in_thread()))
+# bounds_for(n) spans n - 1 cells.
+arena_size = state.grid.size + 1
 
 # Initialize OpenGL and Pygame.
-init_opengl()
+phase_start = time.perf_counter()
+init_opengl(arena_size)
 compile_diamond()
-compile_cube_list()
-
-# Set up fonts.
-# Using score_font for both scores and legend.
-score_font = pygame.font.SysFont("Arial", 48, bold=True)
-title_font = pygame.font.SysFont("Arial", 40, bold=True)
-goal_font = pygame.font.SysFont("Arial", 36, bold=True)
-win_font = pygame.font.SysFont("Arial", 36, bold=True)
-
-# Delay and initialize audio.
-print("Starting in 10 seconds...")
-time.sleep(10)
-pygame.mixer.init()
-pygame.mixer.music.load("empressoflight.mp3")
-pygame.mixer.music.set_volume(0.5)
-pygame.mixer.music.play(-1)
+compile_cube_list(arena_size)
+startup['display'] = time.perf_counter() - phase_start
+
+# Fonts and music load in the background; the HUD appears once fonts are in.
+assets = AssetLoader(audio=not args.no_audio).start()
 
 # Game variables.
 mouse_dragging = False
-green_food_eaten = 0
-purple_cooldown = 0
 
-# Initialize food lists.
-green_foods = [spawn_green_food() for _ in range(MAX_GREEN_FOOD)]
-orange_foods = []
-purple_foods = []
+# Camera spin in degrees per second, independent of the frame rate.
+CAMERA_SPIN = 8.0
 
-# Create two snakes.
-snake1 = Snake((1, 0, 0), [0, 0, 0])   # Red snake.
-snake2 = Snake((0, 0, 1), [2, 2, 2])     # Blue snake.
+# F3 toggles the profiler; while it is off nothing is timed.
+profiler = Profiler(export_path=args.profile)
+active_profiler = profiler if args.profile else None
+state.profiler = active_profiler
 
+phase_start = time.perf_counter()
 clock = pygame.time.Clock()
+lod.enabled = not args.no_lod
+target_fps = args.fps if args.target_fps is None else args.target_fps
+governor = QualityGovernor(target_fps) if target_fps and lod.enabled else None
 running = True
-winner = None
+first_frame = True
+
+# Fixed-timestep loop: the simulation advances in whole ticks of tick_dt while
+# frames render as often as --fps allows, drawing the snakes part-way between
+# the previous and current tick. previous is None when there is nothing to
+# interpolate from (start, seek, turbo).
+tick_dt = 1.0 / (args.tick_rate * args.speed)
+accumulator = 0.0
+previous = None
+alpha = 1.0
+last_time = time.perf_counter()
+countdown_end = last_time + args.countdown
 
 # Main game loop.
 while running:
-    pygame.time.delay(120)
-    if purple_cooldown > 0:
-        purple_cooldown -= 1
+    now = time.perf_counter()
+    # Clamp long stalls (window drags, breakpoints) so we never try to catch up on them.
+    frame_dt = min(now - last_time, 0.25)
+    last_time = now
+    if active_profiler is not None:
+        active_profiler.restart()
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -66,140 +140,75 @@ while running:
         elif event.type == pygame.MOUSEMOTION and mouse_dragging:
             dx, _ = pygame.mouse.get_rel()
             glRotatef(dx * 0.5, 0, 1, 0)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            active_profiler = None if active_profiler else profiler
+            state.profiler = active_profiler
+        elif event.type == pygame.KEYDOWN and args.replay:
+            # Seek through the replay via its keyframes.
+            if event.key == pygame.K_RIGHT:
+                state.seek(state.ticks + 100)
+            elif event.key == pygame.K_LEFT:
+                state.seek(state.ticks - 100)
+            previous = None
+    if active_profiler is not None:
+        active_profiler.mark('events')
     if not mouse_dragging:
-        glRotatef(1.0, 0, 1, 0)
+        glRotatef(CAMERA_SPIN * frame_dt, 0, 1, 0)
 
-    # Update light position based on snake1's head.
-    head_pos = snake1.body[0]
+    # Update light position based on the first snake's head.
+    head_pos = state.snakes[0].body[0]
     glLightfv(GL_LIGHT0, GL_POSITION, [head_pos[0], head_pos[1], head_pos[2], 1.0])
 
-    # Have each snake decide a new direction and then move.
-    snake1.change_direction(snake2, green_foods, orange_foods, purple_foods)
-    snake2.change_direction(snake1, green_foods, orange_foods, purple_foods)
-    snake1.move(snake2)
-    snake2.move(snake1)
-
-    # Set thresholds for food collision.
-    thresh1 = 1.5 if snake1.speed_boost_timer > 0 else 0.5
-    thresh2 = 1.5 if snake2.speed_boost_timer > 0 else 0.5
-
-    # Check for collisions with green food.
-    for food in green_foods[:]:
-        if (np.linalg.norm(snake1.body[0] - food.position) < thresh1 or
-            np.linalg.norm(snake2.body[0] - food.position) < thresh2):
-            if np.linalg.norm(snake1.body[0] - food.position) < thresh1:
-                snake1.grow()
-            else:
-                snake2.grow()
-            green_foods.remove(food)
-            green_food_eaten += 1
-            if green_food_eaten % 2 == 0 and len(orange_foods) < MAX_ORANGE_FOOD:
-                orange_foods.append(spawn_orange_food())
-
-    # Check for collisions with orange food.
-    for food in orange_foods[:]:
-        if (np.linalg.norm(snake1.body[0] - food.position) < thresh1 or
-            np.linalg.norm(snake2.body[0] - food.position) < thresh2):
-            if np.linalg.norm(snake1.body[0] - food.position) < thresh1:
-                snake1.grow(3)
-            else:
-                snake2.grow(3)
-            orange_foods.remove(food)
-
-    # Check for collisions with purple food.
-    for food in purple_foods[:]:
-        if (np.linalg.norm(snake1.body[0] - food.position) < thresh1 or
-            np.linalg.norm(snake2.body[0] - food.position) < thresh2):
-            if np.linalg.norm(snake1.body[0] - food.position) < thresh1:
-                snake1.speed_boost_timer = 30
-            else:
-                snake2.speed_boost_timer = 30
-            purple_foods.remove(food)
-
-    # Spawn purple food based on length difference.
-    if abs(len(snake1.body) - len(snake2.body)) > 3 and not purple_foods and purple_cooldown <= 0:
-        purple_foods.append(spawn_purple_food())
-        purple_cooldown = 50
-
-    # Ensure there is always enough green food.
-    while len(green_foods) < MAX_GREEN_FOOD:
-        green_foods.append(spawn_green_food())
-
-    # If a snake is boosted, move it an extra time.
-    if snake1.speed_boost_timer > 0:
-        for _ in range(2):
-            snake1.move(snake2)
-        snake1.speed_boost_timer -= 1
-    if snake2.speed_boost_timer > 0:
-        for _ in range(2):
-            snake2.move(snake1)
-        snake2.speed_boost_timer -= 1
-
-    # Check for a win.
-    if len(snake1.body) >= WINNING_LENGTH:
-        winner = "Red Snake Won!"
-        running = False
-    elif len(snake2.body) >= WINNING_LENGTH:
-        winner = "Blue Snake Won!"
-        running = False
+    if now < countdown_end:
+        # The match is held until the countdown ends.
+        pass
+    elif args.turbo:
+        for _ in range(args.turbo):
+            if not state.step():
+                running = False
+                break
+        previous = None
+    else:
+        accumulator += frame_dt
+        while accumulator >= tick_dt:
+            accumulator -= tick_dt
+            previous = [snake.body.array() for snake in state.snakes]
+            if not state.step():
+                running = False
+                break
+        alpha = min(accumulator / tick_dt, 1.0)
 
     # Draw the scene.
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    draw_arena()
-    snake1.draw()
-    snake2.draw()
-    for food in green_foods:
-        food.draw()
-    for food in orange_foods:
-        food.draw()
-    for food in purple_foods:
-        food.draw()
-
-    # Set up orthographic projection for overlay text.
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, DISPLAY_SIZE[0], 0, DISPLAY_SIZE[1])
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-
-    glDisable(GL_LIGHTING)
-    glDisable(GL_DEPTH_TEST)
-
-    # Draw scores.
-    red_score_text = f"Red: {len(snake1.body)}"
-    blue_score_text = f"Blue: {len(snake2.body)}"
-    red_text_height = score_font.size(red_score_text)[1]
+    message = f"Starting in {int(countdown_end - now) + 1}" if now < countdown_end else None
+    draw_frame(state, assets.fonts, previous, alpha, message, active_profiler)
 
-    draw_text_top_left(red_score_text, 20, 20, score_font, (255, 0, 0, 255))
-    draw_text_top_left(blue_score_text, 20, 20 + red_text_height + 10, score_font, (0, 0, 255, 255))
-    
-    # Draw legend with larger, better formatted text.
-    # We'll use score_font (48px) and 60-pixel vertical spacing.
-    legend_x_offset = 10
-    legend_y_offset = 10
-    line_spacing = 60
-    draw_text_top_right("Legend:", legend_x_offset, legend_y_offset, score_font, (255, 255, 255, 255))
-    draw_text_top_right("Green: +1", legend_x_offset, legend_y_offset + line_spacing, score_font, (0, 255, 0, 255))
-    draw_text_top_right("Orange: +3", legend_x_offset, legend_y_offset + 2 * line_spacing, score_font, (255, 165, 0, 255))
-    draw_text_top_right("Purple: BOOST", legend_x_offset, legend_y_offset + 3 * line_spacing, score_font, (128, 0, 128, 255))
-    
-    draw_text_top_center("3D Snake Game", 10, title_font, (255, 255, 255, 255))
-    draw_text_bottom_center("Goal: 100", 10, goal_font, (255, 255, 255, 255))
-    
-    glEnable(GL_DEPTH_TEST)
-    glEnable(GL_LIGHTING)
-    
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
-    
     pygame.display.flip()
-    clock.tick(10)
-
-# Victory screen.
+    if active_profiler is not None:
+        active_profiler.mark('flip')
+        active_profiler.end_frame()
+    if governor is not None:
+        governor.update((time.perf_counter() - now) * 1000)
+    if first_frame:
+        first_frame = False
+        startup['first frame'] = time.perf_counter() - phase_start
+        print("Startup: " + ", ".join(f"{k} {v:.2f}s" for k, v in startup.items()) +
+              f", total {time.perf_counter() - startup_begin:.2f}s")
+    if not args.turbo:
+        clock.tick(args.fps)
+
+if recorder is not None:
+    recorder.save(args.record)
+profiler.close()
+if getattr(state, 'planner', None) is not None:
+    state.planner.close()
+
+# Victory screen, unless the window was closed before anyone won.
+winner = state.winner
+if winner is None:
+    pygame.quit()
+    exit()
+fonts = assets.wait_fonts()
+title_font, goal_font, win_font = fonts['title'], fonts['goal'], fonts['win']
 while True:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -218,7 +227,10 @@ while True:
     glDisable(GL_LIGHTING)
     
     draw_text_top_center("3D Snake Game", 10, title_font, (255, 255, 255, 255))
-    win_color = (255, 0, 0, 255) if "Red" in winner else (0, 0, 255, 255) if "Blue" in winner else (255, 255, 255, 255)
+    win_color = (255, 255, 255, 255)
+    for snake, name in zip(state.snakes, state.names):
+        if winner.startswith(name + " "):
+            win_color = tuple(int(c * 255) for c in snake.color) + (255,)
     draw_text_center(winner, win_font, win_color)
     draw_text_bottom_center("Goal: 100", 10, goal_font, (255, 255, 255, 255))
     
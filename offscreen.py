@@ -0,0 +1,244 @@
+# offscreen.py
+"""Headless OpenGL rendering, without a window or display server.
+
+PyOpenGL chooses its platform when OpenGL is first imported, so call
+select_backend() before anything imports OpenGL (graphics.py included):
+
+    import offscreen
+    offscreen.select_backend('egl')
+    context = offscreen.OffscreenContext((800, 600))
+    import graphics
+
+Run as a script it renders a seeded match or a replay and streams the frames,
+as raw RGB for an external encoder or as numbered PNGs:
+
+    python offscreen.py --seed 3 --raw - | ffmpeg -f rawvideo -pix_fmt rgb24 \\
+        -s 1920x1080 -r 30 -i - highlight.mp4
+    python offscreen.py --replay match.snkr --png frames/
+"""
+import argparse
+import ctypes
+import os
+import queue
+import sys
+import threading
+
+import numpy as np
+
+from config import DISPLAY_SIZE, GRID_SIZE
+
+BACKENDS = ('egl', 'osmesa')
+
+# With --raw -, stdout carries the frames, so pygame must not print its banner there.
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+def select_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown offscreen backend {backend!r}; expected one of {BACKENDS}")
+    os.environ['PYOPENGL_PLATFORM'] = backend
+    if backend == 'egl':
+        # Mesa's surfaceless platform needs no X or Wayland server.
+        os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+
+class OffscreenContext:
+    """A current GL context of the given size, backed by OSMesa or an EGL pbuffer."""
+    def __init__(self, size=DISPLAY_SIZE, backend=None):
+        self.size = size
+        self.backend = backend or os.environ.get('PYOPENGL_PLATFORM', 'egl')
+        if self.backend == 'osmesa':
+            self._init_osmesa()
+        elif self.backend == 'egl':
+            self._init_egl()
+        else:
+            raise ValueError(f"Unknown offscreen backend {self.backend!r}; expected one of {BACKENDS}")
+
+    def _init_osmesa(self):
+        from OpenGL import GL, arrays, osmesa
+        width, height = self.size
+        self._context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+        if not self._context:
+            raise RuntimeError("OSMesaCreateContextExt failed")
+        # OSMesa renders straight into this client-side buffer.
+        self._buffer = arrays.GLubyteArray.zeros((height, width, 4))
+        if not osmesa.OSMesaMakeCurrent(self._context, self._buffer, GL.GL_UNSIGNED_BYTE, width, height):
+            raise RuntimeError("OSMesaMakeCurrent failed")
+
+    def _init_egl(self):
+        from OpenGL import EGL
+        width, height = self.size
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+            raise RuntimeError("eglInitialize failed")
+        attributes = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+                      EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+                      EGL.EGL_ALPHA_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24,
+                      EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE]
+        config = EGL.EGLConfig()
+        count = EGL.EGLint()
+        if not EGL.eglChooseConfig(display, (EGL.EGLint * len(attributes))(*attributes),
+                                   ctypes.pointer(config), 1, ctypes.pointer(count)) or count.value == 0:
+            raise RuntimeError("No EGL config supports desktop OpenGL pbuffers")
+        surface_attributes = [EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE]
+        surface = EGL.eglCreatePbufferSurface(display, config,
+                                              (EGL.EGLint * len(surface_attributes))(*surface_attributes))
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+        if not EGL.eglMakeCurrent(display, surface, surface, context):
+            raise RuntimeError("eglMakeCurrent failed")
+        self._display, self._surface, self._context = display, surface, context
+
+    def close(self):
+        if self.backend == 'osmesa':
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self._context)
+        else:
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self._display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(self._display, self._surface)
+            EGL.eglDestroyContext(self._display, self._context)
+            EGL.eglTerminate(self._display)
+
+class FrameSink:
+    """Reads frames back from the current GL context and writes them on a background thread.
+
+    A fixed pool of depth readback buffers is allocated up front and
+    recycled, so a frame costs no allocation; capture() only waits when
+    every buffer is still queued for writing. write(index, frame) is called on the writer
+    thread with a top-down (height, width, 3) uint8 array it must not keep.
+    """
+    def __init__(self, write, size=DISPLAY_SIZE, depth=4):
+        width, height = size
+        self.size = size
+        self.frames = 0
+        self.error = None
+        self._write = write
+        self._free = queue.Queue()
+        for _ in range(depth):
+            self._free.put(np.empty((height, width, 3), dtype=np.uint8))
+        self._pending = queue.Queue()
+        self._flipped = np.empty((height, width, 3), dtype=np.uint8)
+        self._thread = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+        self._thread.start()
+
+    def capture(self):
+        """Queue the current framebuffer as the next frame."""
+        from OpenGL.GL import glPixelStorei, glReadPixels, GL_PACK_ALIGNMENT, GL_RGB, GL_UNSIGNED_BYTE
+        if self.error is not None:
+            raise self.error
+        buffer = self._free.get()
+        width, height = self.size
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixels(0, 0, width, height, GL_RGB, GL_UNSIGNED_BYTE, buffer)
+        self._pending.put((self.frames, buffer))
+        self.frames += 1
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            index, buffer = item
+            # GL rows run bottom-up.
+            np.copyto(self._flipped, buffer[::-1])
+            self._free.put(buffer)
+            if self.error is None:
+                try:
+                    self._write(index, self._flipped)
+                except Exception as e:
+                    # Keep recycling buffers so capture() can report this instead of blocking.
+                    self.error = e
+
+    def close(self):
+        """Write out every queued frame and stop the writer thread."""
+        self._pending.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+def raw_writer(stream):
+    """Frame writer for a binary stream (file or pipe): rgb24 frames back to back."""
+    def write(index, frame):
+        stream.write(frame.data)
+    return write
+
+def png_writer(directory, pattern="frame_{:06d}.png"):
+    """Frame writer that saves each frame as a numbered PNG in directory."""
+    import pygame
+    os.makedirs(directory, exist_ok=True)
+    def write(index, frame):
+        height, width, _ = frame.shape
+        surface = pygame.image.frombuffer(frame.data, (width, height), 'RGB')
+        pygame.image.save(surface, os.path.join(directory, pattern.format(index)))
+    return write
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a match without a window.")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the match to simulate")
+    parser.add_argument('--replay', metavar='PATH', help="render a recorded replay instead")
+    parser.add_argument('--snakes', type=int, default=2)
+    parser.add_argument('--arena', type=int, default=GRID_SIZE)
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--raw', metavar='PATH', help="write raw rgb24 frames to a file, or - for stdout")
+    output.add_argument('--png', metavar='DIR', help="write a numbered PNG sequence")
+    parser.add_argument('--every', type=int, default=1, metavar='N', help="render every Nth tick")
+    parser.add_argument('--max-ticks', type=int, default=10000)
+    parser.add_argument('--spin', type=float, default=1.0, help="camera spin in degrees per frame")
+    parser.add_argument('--size', type=int, nargs=2, default=DISPLAY_SIZE, metavar=('W', 'H'))
+    parser.add_argument('--backend', choices=BACKENDS, default='egl')
+    args = parser.parse_args()
+
+    select_backend(args.backend)
+    size = tuple(args.size)
+    context = OffscreenContext(size, args.backend)
+    # Imported only now that the GL platform is chosen.
+    import pygame
+    import graphics
+    from OpenGL.GL import glRotatef
+    from assets import AssetLoader
+    from game import GameState
+    from replay import ReplayPlayer
+
+    if args.replay:
+        state = ReplayPlayer.load(args.replay)
+    else:
+        state = GameState(seed=args.seed, num_snakes=args.snakes, grid_size=args.arena)
+    arena_size = state.grid.size + 1
+    graphics.setup_gl(size, arena_size)
+    # Frames are not shown live, so there is no frame rate to protect.
+    graphics.lod.enabled = False
+    graphics.compile_diamond()
+    graphics.compile_cube_list(arena_size)
+    pygame.font.init()
+    fonts = AssetLoader(audio=False).start().wait_fonts()
+
+    if args.raw:
+        stream = sys.stdout.buffer if args.raw == '-' else open(args.raw, 'wb')
+        write = raw_writer(stream)
+    else:
+        stream = None
+        write = png_writer(args.png)
+    sink = FrameSink(write, size)
+    try:
+        while True:
+            graphics.draw_frame(state, fonts)
+            sink.capture()
+            glRotatef(args.spin, 0, 1, 0)
+            running = True
+            for _ in range(args.every):
+                running = state.step() and state.ticks < args.max_ticks
+                if not running:
+                    break
+            if not running:
+                break
+        graphics.draw_frame(state, fonts, message=state.winner)
+        sink.capture()
+    finally:
+        sink.close()
+        if stream is not None and stream is not sys.stdout.buffer:
+            stream.close()
+        context.close()
+    print(f"Rendered {sink.frames} frames", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# pathfinding.py
+import numpy as np
+from food import GREEN, ORANGE, PURPLE
+
+UNREACHABLE = np.iinfo(np.int32).max
+
+# Same order as Snake.change_direction's possible_directions.
+DIRECTIONS = [np.array([1, 0, 0]), np.array([-1, 0, 0]),
+              np.array([0, 1, 0]), np.array([0, -1, 0]),
+              np.array([0, 0, 1]), np.array([0, 0, -1])]
+
+# Head start, in steps, given to each food type's BFS source: a green apple
+# has to be this much closer than an orange or purple one to be preferred.
+FOOD_OFFSETS = {GREEN: 12, ORANGE: 0, PURPLE: 0}
+
+# Cells a boosted snake covers per tick, one direction for all of them (GameState.step).
+BOOST_STEPS = 3
+
+class PaddedGrid:
+    """Flat view of an OccupancyGrid with a one-cell wall around it.
+
+    The wall lets neighbour lookups be plain index offsets with no bounds
+    checks, so BFS work is proportional to the frontier, not the arena.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        p = grid.size + 2
+        self.shape = (p, p, p)
+        self.offsets = np.array([p * p, -p * p, p, -p, 1, -1])
+        self.free = np.zeros(p ** 3, dtype=bool)
+        self._free3 = self.free.reshape(self.shape)
+        self._stamp = np.zeros(p ** 3, dtype=np.int64)
+
+    def refresh(self):
+        """Copy all of the grid's free cells."""
+        self._free3[1:-1, 1:-1, 1:-1] = self.grid.counts == 0
+
+    def apply(self, cells):
+        """Catch up on grid flat indices from OccupancyGrid.changes; returns the cells whose state flipped.
+
+        Cells listed more than once, or that flipped back, are handled.
+        """
+        grid = self.grid
+        cells = np.unique(np.asarray(cells, dtype=np.int64))
+        x, y, z = np.unravel_index(cells, grid.counts.shape)
+        now = grid.counts[x, y, z] == 0
+        p = self.shape[0]
+        cells = ((x + 1) * p + (y + 1)) * p + (z + 1)
+        flipped = self.free[cells] != now
+        cells = cells[flipped]
+        self.free[cells] = now[flipped]
+        return cells
+
+    def flat(self, pos):
+        """Flat index of an in-bounds position."""
+        x, y, z = self.grid.index(pos)
+        p = self.shape[0]
+        return ((x + 1) * p + (y + 1)) * p + (z + 1)
+
+    def neighbors(self, cells):
+        return (cells[:, None] + self.offsets).ravel()
+
+    def unique(self, cells):
+        """Drop duplicate flat indices in O(n), without sorting."""
+        order = np.arange(len(cells))
+        self._stamp[cells] = order
+        return cells[self._stamp[cells] == order]
+
+def flood_fill(padded, start, limit=None):
+    """Count free cells reachable from flat index start, stopping early once limit is reached.
+
+    Returns the count and the boolean mask of cells reached.
+    """
+    free = padded.free
+    reached = np.zeros_like(free)
+    reached[start] = True
+    frontier = np.array([start])
+    count = 1
+    while len(frontier) and (limit is None or count < limit):
+        nb = padded.neighbors(frontier)
+        nb = padded.unique(nb[free[nb] & ~reached[nb]])
+        reached[nb] = True
+        count += len(nb)
+        frontier = nb
+    return count, reached
+
+class DistanceField:
+    """Multi-source BFS distance from every free cell to the nearest food.
+
+    Food cells are sources, started at their FOOD_OFFSETS level. The field is
+    shared by all snakes in a match and updated at most once per tick. It
+    follows the grid through OccupancyGrid.changes, so an update only looks
+    at the cells that heads and tails entered or left. When the food is
+    unchanged, the field is repaired rather than rebuilt: every cell no
+    farther than the closest change keeps its distance, and the BFS resumes
+    from that layer.
+    """
+    def __init__(self, grid, foods):
+        self.grid = grid
+        self.foods = foods
+        self.padded = PaddedGrid(grid)
+        self.dist = np.full(len(self.padded.free), UNREACHABLE, dtype=np.int32)
+        self._sources = {}   # flat index -> starting level, for free food cells
+        self._food_cells = set()
+        self._food_key = None
+        self._stale = True
+        grid.changes = []
+
+    def invalidate(self):
+        """Rescan the whole grid on the next update, after it changed without logging (GameState.restore)."""
+        self._stale = True
+
+    def distance(self, pos):
+        return int(self.dist[self.padded.flat(pos)])
+
+    def update(self):
+        """Bring the field up to date with the grid and food; cheap when nothing changed."""
+        padded = self.padded
+        log = self.grid.changes
+        foods = self.foods
+        n = len(foods)
+        food_key = foods.positions[:n].tobytes() + foods.kinds[:n].tobytes()
+        if self._stale or food_key != self._food_key:
+            log.clear()
+            padded.refresh()
+            self._stale = False
+            self._food_key = food_key
+            self._rebuild()
+            return
+        if not log:
+            return
+        changed = padded.apply(log)
+        log.clear()
+        if len(changed) == 0:
+            return
+        free = padded.free
+        if not self._food_cells.isdisjoint(changed.tolist()):
+            self._rebuild()
+            return
+        dist = self.dist
+        blocked = changed[~free[changed]]
+        freed = changed[free[changed]]
+        level = UNREACHABLE
+        if len(blocked):
+            level = int(dist[blocked].min())
+        if len(freed):
+            level = min(level, int(dist[padded.neighbors(freed)].min()))
+        dist[blocked] = UNREACHABLE
+        if level == UNREACHABLE:
+            # Only cells cut off from all food changed.
+            return
+        dist[dist > level] = UNREACHABLE
+        pending = {cell: start for cell, start in self._sources.items() if start > level and free[cell]}
+        self._expand(np.flatnonzero(dist == level), level, pending)
+
+    def _rebuild(self):
+        padded = self.padded
+        foods = self.foods
+        sources = {}
+        self._food_cells.clear()
+        for pos, kind in zip(foods.positions[:len(foods)], foods.kinds[:len(foods)]):
+            if not self.grid.in_bounds(pos):
+                continue
+            cell = padded.flat(pos)
+            self._food_cells.add(cell)
+            start = FOOD_OFFSETS[int(kind)]
+            if padded.free[cell] and start < sources.get(cell, UNREACHABLE):
+                sources[cell] = start
+        self._sources = sources
+        self.dist.fill(UNREACHABLE)
+        self._expand(np.array([], dtype=np.int64), -1, dict(sources))
+
+    def _expand(self, frontier, level, pending):
+        """Level-synchronous BFS from frontier at level, adding pending sources as their level comes up."""
+        dist, free = self.dist, self.padded.free
+        while len(frontier) or pending:
+            level += 1
+            nb = self.padded.neighbors(frontier)
+            nb = nb[free[nb] & (dist[nb] == UNREACHABLE)]
+            starting = [cell for cell, start in pending.items() if start == level]
+            for cell in starting:
+                del pending[cell]
+            if starting:
+                nb = np.concatenate([nb, np.array(starting, dtype=nb.dtype)])
+                nb = nb[dist[nb] == UNREACHABLE]
+            frontier = self.padded.unique(nb)
+            dist[frontier] = level
+
+class PathfindingAI:
+    """Snake controller that follows a shared DistanceField downhill.
+
+    Moves into cells whose free region is smaller than the snake's body are
+    treated as dead ends and only taken when every move is one; then the
+    roomiest is chosen. A boosted snake grabs any food in reach of its next
+    cell, and otherwise judges a move by where its whole boosted stride ends.
+    """
+    def __init__(self, field):
+        self.field = field
+
+    def choose(self, snake, other, foods):
+        field = self.field
+        field.update()
+        padded = field.padded
+        head = snake.body[0]
+        need = len(snake.body)
+
+        safe = []
+        component = None
+        area = 0
+        for direction in DIRECTIONS:
+            pos = head + direction
+            if not snake.grid.in_bounds(pos):
+                continue
+            cell = padded.flat(pos)
+            if not padded.free[cell]:
+                continue
+            # Neighbours in the same free region share one flood fill.
+            if component is None or not component[cell]:
+                area, component = flood_fill(padded, cell, need)
+            score = int(field.dist[cell])
+            if snake.speed_boost_timer > 0:
+                score = self._boost_score(snake, pos, direction, foods)
+            safe.append((area >= need, score, area, direction))
+        if not safe:
+            return None
+
+        roomy = [s for s in safe if s[0]]
+        if roomy:
+            # Closest food first, keeping the current heading on ties.
+            return min(roomy, key=lambda s: (s[1], not np.array_equal(s[3], snake.direction)))[3]
+        return max(safe, key=lambda s: s[2])[3]
+
+    def _boost_score(self, snake, pos, direction, foods):
+        """Score of a boosted move: the snake goes BOOST_STEPS cells in a straight line but only eats from pos."""
+        n = len(foods)
+        if n:
+            # Boosted heads eat within 1.5 cells: squared distance 2 on the integer grid.
+            reach = ((foods.positions[:n] - pos) ** 2).sum(axis=1)
+            if (reach <= 2).any():
+                return -1
+        padded = self.field.padded
+        end = pos
+        for _ in range(BOOST_STEPS - 1):
+            nxt = end + direction
+            if not snake.grid.in_bounds(nxt) or not padded.free[padded.flat(nxt)]:
+                break
+            end = nxt
+        return int(self.field.dist[padded.flat(end)])
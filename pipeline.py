@@ -0,0 +1,165 @@
+# pipeline.py
+"""Snake AI decisions computed off the render thread.
+
+At the end of each tick AIPipeline hands GameState.snapshot() to a worker
+per controlled snake, which runs that snake's controller on its own mirror
+of the match while the caller renders. The next tick collects the
+decisions; a snake whose worker misses the deadline falls back to the
+built-in greedy steering for that tick, so a slow AI only slows itself.
+
+A decision only depends on the position at the end of the previous tick, and
+the mirror's controllers see the same positions in the same order, so with
+no missed deadlines a pipelined match plays exactly like a serial one.
+
+    state = GameState(seed=1, ai='search')
+    state.planner = AIPipeline(state, mode='process', deadline=0.05)
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+
+MODES = ('thread', 'process')
+
+class Mirror:
+    """A private GameState that is restored from each snapshot and asked for decisions.
+
+    Controllers keep their caches (distance field, transposition table)
+    between calls, just as they would in the real match.
+    """
+    def __init__(self, ais, num_snakes, grid_size, green_food):
+        from game import GameState
+        self.state = GameState(seed=0, ai=ais, num_snakes=num_snakes, grid_size=grid_size, green_food=green_food)
+
+    def decide(self, snap, index):
+        """The direction snake index takes next tick.
+
+        Controllers only look at positions, not at the directions other
+        snakes chose this tick, so each snake can be decided on its own.
+        """
+        state = self.state
+        state.restore(snap)
+        snakes = state.snakes
+        foods = state.foods
+        foods.measure([snake.body[0] for snake in snakes])
+        snake = snakes[index]
+        snake.change_direction(state.rival(snake), foods)
+        return snake.direction.copy()
+
+# The worker process's mirror, built once by its initializer.
+_mirror = None
+
+def _start_worker(*args):
+    global _mirror
+    _mirror = Mirror(*args)
+
+def _decide(snap, index):
+    return _mirror.decide(snap, index)
+
+class Worker:
+    """One controlled snake's executor, with its pending decision and any late one still running."""
+    def __init__(self, index, mode, args):
+        self.index = index
+        if mode == 'process':
+            self.executor = ProcessPoolExecutor(1, initializer=_start_worker, initargs=args)
+            self.decide = _decide
+        else:
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix=f"snake-ai-{index}")
+            self.decide = Mirror(*args).decide
+        self.future = None
+        # A decision that missed its deadline and is still occupying the executor.
+        self.late = None
+
+    def submit(self, snap):
+        """Start deciding from snap, unless a late decision still occupies the executor."""
+        # cancel() fails once the executor has started.
+        if self.future is not None and not self.future.cancel():
+            self.late = self.future
+        self.future = None
+        if self.late is not None and not self.late.done():
+            return
+        self.late = None
+        self.future = self.executor.submit(self.decide, snap, self.index)
+
+    def result(self, timeout):
+        """The pending decision, or None if there is none or it is not ready within timeout."""
+        future, self.future = self.future, None
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if not future.cancel():
+                self.late = future
+            return None
+
+    def close(self):
+        for future in (self.future, self.late):
+            if future is not None:
+                future.cancel()
+        # A decision already running is bounded by its AI's budget, so waiting for it is short.
+        self.executor.shutdown(wait=True)
+
+class AIPipeline:
+    """Computes each tick's controller decisions in a worker; set it as GameState.planner.
+
+    Every snake with a controller gets its own worker and mirror. mode
+    'thread' runs them on worker threads, which suits the NumPy-heavy 'bfs'
+    AI; 'process' runs them in worker processes so that pure-Python AIs such
+    as 'search' do not compete with rendering for the GIL. deadline is how
+    many seconds after a tick ends the next tick waits for its decisions
+    (None waits forever); misses counts the snake decisions that fell back
+    to greedy steering.
+    """
+    def __init__(self, state, mode='thread', deadline=0.1):
+        if mode not in MODES:
+            raise ValueError(f"Unknown pipeline mode {mode!r}; expected one of {MODES}")
+        args = (state.ais, len(state.snakes), state.grid.size + 1, state.green_food)
+        # Greedy steering is cheap, so the caller does it on the live match.
+        self.workers = [None if snake.controller is None else Worker(snake.id, mode, args)
+                        for snake in state.snakes]
+        self.mode = mode
+        self.deadline = deadline
+        self.misses = 0
+        self._ticks = None
+        self._submitted = 0.0
+        self.submit(state)
+
+    def submit(self, state):
+        """Start computing the decisions for the tick after state's current one.
+
+        Nothing is queued for a snake whose worker is still busy with a late
+        decision; that snake falls back to greedy steering next tick instead
+        of every later decision arriving late behind it.
+        """
+        self._ticks = state.ticks
+        self._submitted = time.perf_counter()
+        snap = state.snapshot()
+        for worker in self.workers:
+            if worker is not None:
+                worker.submit(snap)
+
+    def decide(self, state, rivals):
+        """Set every snake's direction for the tick state has just started, as change_direction would."""
+        # Anything but the previous tick's snapshot is stale.
+        fresh = self._ticks == state.ticks - 1
+        foods = state.foods
+        for snake, rival, worker in zip(state.snakes, rivals, self.workers):
+            if worker is None:
+                snake.change_direction(rival, foods)
+                continue
+            timeout = 0.0
+            if fresh and self.deadline is not None:
+                timeout = max(0.0, self._submitted + self.deadline - time.perf_counter())
+            elif fresh:
+                timeout = None
+            direction = worker.result(timeout)
+            if direction is not None and fresh:
+                snake.direction = direction
+            else:
+                snake.steer(rival, foods)
+                self.misses += 1
+
+    def close(self):
+        """Cancel pending decisions and wait for the workers to stop."""
+        for worker in self.workers:
+            if worker is not None:
+                worker.close()
@@ -0,0 +1,93 @@
+# profiler.py
+"""Per-phase timing of ticks and frames.
+
+Code under measurement calls mark(phase) at the end of each phase; the time
+since the previous mark is charged to that phase. GameState and draw_frame
+only do this when handed a profiler, so a disabled profiler costs nothing.
+"""
+import csv
+import json
+import time
+
+import numpy as np
+
+# Simulation phases (charged per tick) followed by render phases (per frame).
+TICK_PHASES = ('ai', 'move', 'food', 'spawn')
+FRAME_PHASES = ('events', 'arena', 'snakes', 'food_draw', 'hud', 'flip')
+PHASES = TICK_PHASES + FRAME_PHASES
+
+# Bar colors for the on-screen graph, one per phase.
+PHASE_COLORS = np.array([
+    (1.0, 0.3, 0.3), (1.0, 0.6, 0.2), (0.3, 0.9, 0.3), (0.2, 0.6, 0.2),
+    (0.5, 0.5, 0.5), (0.4, 0.6, 1.0), (0.9, 0.3, 0.9), (0.9, 0.9, 0.3),
+    (0.3, 0.9, 0.9), (0.8, 0.8, 0.8),
+], dtype=np.float32)
+
+class Profiler:
+    """Ring buffer of per-frame phase times, with optional streaming export.
+
+    Each row of frames holds milliseconds per phase for one frame; tick phases
+    are the sum over the ticks run in that frame. With export_path set, every
+    tick and every frame is also appended to a CSV or (for .jsonl) JSON Lines
+    file.
+    """
+    def __init__(self, history=240, export_path=None):
+        self.history = history
+        self.frames = np.zeros((history, len(PHASES)), dtype=np.float32)
+        self.count = 0
+        self._index = {phase: i for i, phase in enumerate(PHASES)}
+        self._frame = np.zeros(len(PHASES), dtype=np.float64)
+        self._tick = np.zeros(len(TICK_PHASES), dtype=np.float64)
+        self._last = time.perf_counter()
+        self._file = None
+        self._writer = None
+        if export_path is not None:
+            self._file = open(export_path, 'w', newline='')
+            if not export_path.endswith('.jsonl'):
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(('kind', 'number') + PHASES)
+
+    def restart(self):
+        """Start timing from now; call at the top of a frame or tick."""
+        self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        elapsed = (now - self._last) * 1000.0
+        self._last = now
+        i = self._index[phase]
+        self._frame[i] += elapsed
+        if i < len(TICK_PHASES):
+            self._tick[i] += elapsed
+
+    def end_tick(self, tick):
+        if self._file is not None:
+            self._write('tick', tick, self._tick)
+        self._tick[:] = 0
+
+    def end_frame(self):
+        self.frames[self.count % self.history] = self._frame
+        if self._file is not None:
+            self._write('frame', self.count, self._frame)
+        self.count += 1
+        self._frame[:] = 0
+
+    def recent(self):
+        """The stored frames, oldest first."""
+        if self.count < self.history:
+            return self.frames[:self.count]
+        return np.roll(self.frames, -(self.count % self.history), axis=0)
+
+    def _write(self, kind, number, times):
+        # Tick rows only carry the tick phases.
+        values = [round(float(t), 4) for t in times]
+        if self._writer is None:
+            self._file.write(json.dumps({'kind': kind, 'number': number,
+                                         **dict(zip(PHASES, values))}) + "\n")
+        else:
+            self._writer.writerow([kind, number] + values + [''] * (len(PHASES) - len(values)))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
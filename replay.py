@@ -0,0 +1,223 @@
+# replay.py
+"""Compact binary match replays.
+
+A replay stores the seed and arena, a keyframe of the starting position, and
+a byte stream of events: one byte per head move (direction code plus a grew
+flag), food spawns and eats, boost pickups and tick markers. Keyframes with
+full snake bodies and food are taken every KEYFRAME_INTERVAL ticks so playback
+can seek without replaying from the start. Both sections are zlib-compressed;
+a typical match is a few kilobytes.
+"""
+import random
+import struct
+import zlib
+
+import numpy as np
+from food import Food, FOOD_COLORS
+from grid import OccupancyGrid
+from snake import Snake
+
+MAGIC = b'SNKR'
+VERSION = 2
+HEADER = struct.Struct('<4sBBqhhII')   # magic, version, has_seed, seed, min_pos, max_pos, events, keyframes
+KEYFRAME_INTERVAL = 100
+
+# Move bytes are < 0x80: bit 6 is the snake id, bit 3 the grew flag and bits 0-2
+# the direction code (index into MOVE_DELTAS).
+MOVE_DELTAS = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1), (0, 0, 0)]
+_DELTA_CODES = {d: i for i, d in enumerate(MOVE_DELTAS)}
+OP_TICK, OP_SPAWN, OP_EAT, OP_BOOST, OP_END = 0x80, 0x81, 0x82, 0x83, 0x84
+
+SNAKE_COLORS = ((1, 0, 0), (0, 0, 1))
+WINNERS = ("Red Snake Won!", "Blue Snake Won!")
+
+def encode_keyframe(tick, snakes, foods):
+    """Pack a full position: tick, each snake's boost timer and body, and all food."""
+    parts = [struct.pack('<I', tick)]
+    for snake in snakes:
+        body = snake.body.array().astype('<i2')
+        parts.append(struct.pack('<BH', snake.speed_boost_timer, len(body)))
+        parts.append(body.tobytes())
+    parts.append(struct.pack('<H', len(foods)))
+    for food in foods:
+        parts.append(struct.pack('<B3h', food.kind, *(int(c) for c in food.position)))
+    return b''.join(parts)
+
+def decode_keyframe(data):
+    """Inverse of encode_keyframe: (tick, [(boost, body array)] * 2, [(kind, position)])."""
+    tick, = struct.unpack_from('<I', data, 0)
+    offset = 4
+    snakes = []
+    for _ in range(2):
+        boost, n = struct.unpack_from('<BH', data, offset)
+        offset += 3
+        body = np.frombuffer(data, dtype='<i2', count=3 * n, offset=offset).reshape(n, 3)
+        offset += 6 * n
+        snakes.append((boost, body.astype(np.int32)))
+    count, = struct.unpack_from('<H', data, offset)
+    offset += 2
+    foods = []
+    for _ in range(count):
+        kind, x, y, z = struct.unpack_from('<B3h', data, offset)
+        offset += 7
+        foods.append((kind, (x, y, z)))
+    return tick, snakes, foods
+
+class ReplayRecorder:
+    """GameState observer that records the match into replay bytes. Two-snake matches only."""
+    def __init__(self, state, keyframe_interval=KEYFRAME_INTERVAL):
+        if len(state.snakes) != 2:
+            raise ValueError("Replays can only record two-snake matches")
+        self.state = state
+        self.keyframe_interval = keyframe_interval
+        self.events = bytearray()
+        self.keyframes = []   # (tick, event offset, keyframe bytes)
+        self._keyframe(state)
+
+    def _keyframe(self, state):
+        data = encode_keyframe(state.ticks, (state.snake1, state.snake2), state.foods)
+        self.keyframes.append((state.ticks, len(self.events), data))
+
+    def on_move(self, snake, delta, grew):
+        code = _DELTA_CODES[tuple(int(c) for c in delta)]
+        self.events.append(snake.id << 6 | grew << 3 | code)
+
+    def on_spawn(self, food):
+        self.events += struct.pack('<BB3h', OP_SPAWN, food.kind, *(int(c) for c in food.position))
+
+    def on_eat(self, index, food):
+        self.events += struct.pack('<BH', OP_EAT, index)
+
+    def on_boost(self, snake):
+        self.events += struct.pack('<BB', OP_BOOST, snake.id)
+
+    def on_tick(self, state):
+        self.events.append(OP_TICK)
+        if state.winner is not None:
+            self.events += struct.pack('<BB', OP_END, WINNERS.index(state.winner))
+        elif state.ticks % self.keyframe_interval == 0:
+            self._keyframe(state)
+
+    def to_bytes(self):
+        state = self.state
+        index = bytearray(struct.pack('<I', len(self.keyframes)))
+        for tick, offset, data in self.keyframes:
+            index += struct.pack('<III', tick, offset, len(data)) + data
+        events = zlib.compress(bytes(self.events), 9)
+        keyframes = zlib.compress(bytes(index), 9)
+        seed = state.seed if isinstance(state.seed, int) else 0
+        header = HEADER.pack(MAGIC, VERSION, isinstance(state.seed, int), seed,
+                             state.grid.min_pos, state.grid.max_pos, len(events), len(keyframes))
+        return header + events + keyframes
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+class ReplayPlayer:
+    """Plays a replay back by applying recorded deltas; no AI runs.
+
+    Exposes snake1, snake2, foods, ticks and winner like GameState, so the
+    same rendering code draws either.
+    """
+    def __init__(self, data):
+        magic, version, has_seed, seed, min_pos, max_pos, n_events, n_keyframes = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a snake replay (or an unsupported version)")
+        self.seed = seed if has_seed else None
+        offset = HEADER.size
+        self.events = zlib.decompress(data[offset:offset + n_events])
+        index = zlib.decompress(data[offset + n_events:offset + n_events + n_keyframes])
+        self.keyframes = []
+        count, = struct.unpack_from('<I', index, 0)
+        pos = 4
+        for _ in range(count):
+            tick, event_offset, size = struct.unpack_from('<III', index, pos)
+            pos += 12
+            self.keyframes.append((tick, event_offset, index[pos:pos + size]))
+            pos += size
+        self._create(min_pos, max_pos)
+        self._restore(self.keyframes[0])
+
+    def _create(self, min_pos, max_pos):
+        self.grid = OccupancyGrid(min_pos, max_pos)
+        # Bodies come from the keyframe; the private rng keeps Snake() from
+        # touching the global random state.
+        rng = random.Random(0)
+        self.snake1 = Snake(SNAKE_COLORS[0], [0, 0, 0], self.grid, rng)
+        self.snake2 = Snake(SNAKE_COLORS[1], [2, 2, 2], self.grid, rng)
+        self.snakes = (self.snake1, self.snake2)
+        self.names = tuple(winner.split()[0] for winner in WINNERS)
+        self.foods = []
+        self.winner = None
+        self.ticks = 0
+        self._pos = 0
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def _restore(self, keyframe):
+        tick, event_offset, data = keyframe
+        _, snakes, foods = decode_keyframe(data)
+        for snake, (boost, body) in zip(self.snakes, snakes):
+            snake.set_body(body)
+            snake.speed_boost_timer = boost
+        self.foods = [Food(color=FOOD_COLORS[kind], position=pos) for kind, pos in foods]
+        self.ticks = tick
+        self.winner = None
+        self._pos = event_offset
+
+    @property
+    def running(self):
+        return self.winner is None and self._pos < len(self.events)
+
+    def step(self):
+        """Apply one recorded tick. Returns True while there is more to play."""
+        events = self.events
+        pos = self._pos
+        while pos < len(events):
+            op = events[pos]
+            pos += 1
+            if op < 0x80:
+                snake = self.snakes[op >> 6 & 1]
+                dx, dy, dz = MOVE_DELTAS[op & 7]
+                head = snake.body[0]
+                snake.step_to(head + (dx, dy, dz), grow=bool(op & 8))
+            elif op == OP_TICK:
+                self.ticks += 1
+                for snake in self.snakes:
+                    if snake.speed_boost_timer > 0:
+                        snake.speed_boost_timer -= 1
+                if pos < len(events) and events[pos] == OP_END:
+                    self.winner = WINNERS[events[pos + 1]]
+                    pos += 2
+                break
+            elif op == OP_SPAWN:
+                kind, x, y, z = struct.unpack_from('<B3h', events, pos)
+                pos += 7
+                self.foods.append(Food(color=FOOD_COLORS[kind], position=(x, y, z)))
+            elif op == OP_EAT:
+                del self.foods[struct.unpack_from('<H', events, pos)[0]]
+                pos += 2
+            elif op == OP_BOOST:
+                self.snakes[events[pos]].speed_boost_timer = 30
+                pos += 1
+            else:
+                raise ValueError(f"Corrupt replay: unknown opcode {op:#x} at {pos - 1}")
+        self._pos = pos
+        return self.running
+
+    def seek(self, tick):
+        """Jump to the position after tick, via the nearest earlier keyframe."""
+        tick = max(0, tick)
+        keyframe = self.keyframes[0]
+        for candidate in self.keyframes:
+            if candidate[0] > tick:
+                break
+            keyframe = candidate
+        if not (keyframe[0] <= self.ticks <= tick and self.winner is None):
+            self._restore(keyframe)
+        while self.ticks < tick and self.step():
+            pass
@@ -0,0 +1,354 @@
+# search.py
+import time
+from collections import OrderedDict
+
+import numpy as np
+from config import WINNING_LENGTH
+from food import GREEN, ORANGE, PURPLE
+
+# Same order as Snake.change_direction's possible_directions; -1 means "stay".
+DIRECTIONS = [np.array([1, 0, 0]), np.array([-1, 0, 0]),
+              np.array([0, 1, 0]), np.array([0, -1, 0]),
+              np.array([0, 0, 1]), np.array([0, 0, -1])]
+STAY = -1
+
+FOOD_VALUES = {GREEN: 1.0, ORANGE: 3.0, PURPLE: 2.0}
+WIN_SCORE = 1e6
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class _OutOfBudget(Exception):
+    pass
+
+class Tables:
+    """Neighbour arithmetic and Zobrist keys for one arena size.
+
+    Neighbours and eating reach are worked out from cell indices on the
+    fly, so the only storage is the Zobrist keys, kept as np.uint64 arrays.
+    They are read through memoryviews, which hand back plain ints: hashes
+    stay Python ints, cheap to XOR and to use as table keys.
+    """
+    _cache = {}
+
+    @classmethod
+    def get(cls, min_pos, max_pos):
+        key = (min_pos, max_pos)
+        if key not in cls._cache:
+            cls._cache[key] = cls(min_pos, max_pos)
+        return cls._cache[key]
+
+    def __init__(self, min_pos, max_pos):
+        self.min_pos = min_pos
+        s = self.size = max_pos - min_pos + 1
+        n = s ** 3
+        # Per direction, in DIRECTIONS order: the cell index step, the stride
+        # of its axis and the coordinate on that axis it cannot step past.
+        self.steps = (s * s, -s * s, s, -s, 1, -1)
+        self.strides = (s * s, s * s, s, s, 1, 1)
+        self.edges = (s - 1, 0) * 3
+        # Fixed seed so hashes (and searches) are reproducible across processes.
+        rng = np.random.default_rng(0x5A4B)
+        bits = lambda *shape: rng.integers(0, 2 ** 64, size=shape, dtype=np.uint64)
+        self.z_body = [memoryview(keys) for keys in bits(2, n)]
+        self.z_food = [memoryview(keys) for keys in bits(3, n)]
+        self.z_grow = [memoryview(keys) for keys in bits(2, 16)]
+        self.z_boost = [memoryview(keys) for keys in bits(2, 32)]
+        self.z_side = int(bits())
+
+    def cell(self, x, y, z):
+        s = self.size
+        return (x * s + y) * s + z
+
+    def cell_of(self, pos):
+        lo = self.min_pos
+        return self.cell(int(pos[0]) - lo, int(pos[1]) - lo, int(pos[2]) - lo)
+
+    def coords(self, cell):
+        x, rest = divmod(cell, self.size * self.size)
+        return (x,) + divmod(rest, self.size)
+
+    def neighbor(self, cell, d):
+        """The cell one step from cell in direction d, or -1 past the walls."""
+        if cell // self.strides[d] % self.size == self.edges[d]:
+            return -1
+        return cell + self.steps[d]
+
+    def neighbors(self, cell):
+        """neighbor(cell, d) for every direction, in DIRECTIONS order."""
+        s = self.size
+        ss = s * s
+        x, rest = divmod(cell, ss)
+        y, z = divmod(rest, s)
+        top = s - 1
+        return [cell + ss if x < top else -1, cell - ss if x else -1,
+                cell + s if y < top else -1, cell - s if y else -1,
+                cell + 1 if z < top else -1, cell - 1 if z else -1]
+
+    def near(self, head, cell):
+        """Whether a boosted head can eat at cell (distance < 1.5)."""
+        hx, hy, hz = self.coords(head)
+        x, y, z = self.coords(cell)
+        return (x - hx) ** 2 + (y - hy) ** 2 + (z - hz) ** 2 <= 2
+
+class Node:
+    """Immutable search position: both bodies (head first), grow counts, boost timers and food."""
+    __slots__ = ('bodies', 'grow', 'boost', 'foods', 'hash')
+
+    def __init__(self, bodies, grow, boost, foods, hash_):
+        self.bodies = bodies
+        self.grow = grow
+        self.boost = boost
+        self.foods = foods      # Tuple of (cell, kind).
+        self.hash = hash_
+
+    @classmethod
+    def from_game(cls, tables, snakes, foods):
+        bodies = tuple(tuple(tables.cell_of(seg) for seg in snake.body) for snake in snakes)
+        grid = snakes[0].grid
+        food = tuple((tables.cell_of(f.position), f.kind) for f in foods if grid.in_bounds(f.position))
+        grow = tuple(s.grow_count for s in snakes)
+        boost = tuple(s.speed_boost_timer for s in snakes)
+        h = 0
+        for s, body in enumerate(bodies):
+            for c in body:
+                h ^= tables.z_body[s][c]
+            h ^= tables.z_grow[s][min(grow[s], 15)] ^ tables.z_boost[s][min(boost[s], 31)]
+        for c, kind in food:
+            h ^= tables.z_food[kind][c]
+        return cls(bodies, grow, boost, food, h)
+
+def advance(tables, node, s, d, blocked=frozenset()):
+    """Move snake s one tick in direction d (three steps while boosted), like move().
+
+    blocked holds cells of snakes outside the search, which never move.
+    """
+    bodies = node.bodies
+    body, other = bodies[s], bodies[1 - s]
+    g0 = g = node.grow[s]
+    h = node.hash
+    zb = tables.z_body[s]
+    for _ in range(3 if node.boost[s] > 0 else 1):
+        head = body[0]
+        nxt = tables.neighbor(head, d) if d != STAY else head
+        if nxt < 0 or nxt in other or nxt in blocked:
+            nxt = head  # Blocked: stay in place, as move() does.
+        body = (nxt,) + body
+        h ^= zb[nxt]
+        if g > 0:
+            g -= 1
+        else:
+            h ^= zb[body[-1]]
+            body = body[:-1]
+    zg = tables.z_grow[s]
+    h ^= zg[min(g0, 15)] ^ zg[min(g, 15)]
+    new_bodies = (body, other) if s == 0 else (other, body)
+    grow = (g, node.grow[1]) if s == 0 else (node.grow[0], g)
+    return Node(new_bodies, grow, node.boost, node.foods, h)
+
+def resolve(tables, node):
+    """Eat food in reach of either head (red first) and tick boost timers; no respawns are modelled."""
+    h = node.hash
+    head0, head1 = node.bodies[0][0], node.bodies[1][0]
+    boost0, boost1 = node.boost[0] > 0, node.boost[1] > 0
+    grow = list(node.grow)
+    boost = list(node.boost)
+    old_grow, old_boost = tuple(grow), tuple(boost)
+    foods = []
+    for cell, kind in node.foods:
+        if cell == head0 or boost0 and tables.near(head0, cell):
+            eater = 0
+        elif cell == head1 or boost1 and tables.near(head1, cell):
+            eater = 1
+        else:
+            eater = None
+        if eater is None:
+            foods.append((cell, kind))
+            continue
+        h ^= tables.z_food[kind][cell]
+        if kind == GREEN:
+            grow[eater] += 1
+        elif kind == ORANGE:
+            grow[eater] += 3
+        else:
+            boost[eater] = 30
+    for s in (0, 1):
+        if node.boost[s] > 0:
+            boost[s] -= 1
+    for s in (0, 1):
+        h ^= tables.z_grow[s][min(old_grow[s], 15)] ^ tables.z_grow[s][min(grow[s], 15)]
+        h ^= tables.z_boost[s][min(old_boost[s], 31)] ^ tables.z_boost[s][min(boost[s], 31)]
+    return Node(node.bodies, tuple(grow), tuple(boost), tuple(foods), h)
+
+class SearchAI:
+    """Alpha-beta lookahead controller over the 6 axis directions.
+
+    Each round the controlled snake moves, then the opponent, then food is
+    eaten (growth, +3 orange, purple boost with its triple move). Search
+    deepens one round at a time until the time budget or node budget runs
+    out, and uses a Zobrist-keyed transposition table with LRU eviction.
+    stats reports nodes/sec, table hit rate and the depth reached.
+
+    A time budget makes results depend on machine speed; pass only
+    max_nodes for reproducible matches.
+    """
+    def __init__(self, time_budget=0.01, max_nodes=None, max_depth=8, table_size=200000):
+        self.time_budget = time_budget
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.table = OrderedDict()
+        self.stats = {'nodes': 0, 'seconds': 0.0, 'lookups': 0, 'hits': 0, 'depth': 0}
+
+    @property
+    def nodes_per_second(self):
+        return self.stats['nodes'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+    @property
+    def hit_rate(self):
+        return self.stats['hits'] / self.stats['lookups'] if self.stats['lookups'] else 0.0
+
+    def choose(self, snake, other, foods):
+        grid = snake.grid
+        tables = Tables.get(grid.min_pos, grid.max_pos)
+        snakes = (snake, other) if snake.id < other.id else (other, snake)
+        self.tables = tables
+        self.me = 0 if snakes[0] is snake else 1
+        # Only these two snakes are simulated; any others stay where they are now.
+        owner = grid.owner.ravel()
+        others = (grid.counts.ravel() > 0) & (owner != snake.id) & (owner != other.id)
+        self.blocked = frozenset(np.flatnonzero(others).tolist())
+        root = Node.from_game(tables, snakes, foods)
+        # The search never spawns food, so every node's food is among the root's.
+        self.food_coords = {cell: tables.coords(cell) for cell, _ in root.foods}
+
+        start = time.perf_counter()
+        self.deadline = start + self.time_budget if self.time_budget is not None else None
+        self.nodes = 0
+        best = None
+        depth_reached = 0
+        for rounds in range(1, self.max_depth + 1):
+            try:
+                _, move = self._search(root, 2 * rounds, 0, -np.inf, np.inf)
+            except _OutOfBudget:
+                break
+            best = move
+            depth_reached = rounds
+        self.stats['nodes'] += self.nodes
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['depth'] = depth_reached
+        if best is None or best == STAY:
+            return None
+        return DIRECTIONS[best]
+
+    def _moves(self, node, s):
+        body, other = node.bodies[s], node.bodies[1 - s]
+        blocked = self.blocked
+        moves = [d for d, nxt in enumerate(self.tables.neighbors(body[0]))
+                 if nxt >= 0 and nxt not in other and nxt not in body and nxt not in blocked]
+        return moves or [STAY]
+
+    def _lookup(self, key):
+        self.stats['lookups'] += 1
+        entry = self.table.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            self.table.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        table = self.table
+        table[key] = entry
+        table.move_to_end(key)
+        if len(table) > self.table_size:
+            table.popitem(last=False)
+
+    def _search(self, node, depth, ply, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 255 == 0:
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise _OutOfBudget
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise _OutOfBudget
+
+        lengths = [len(b) + g for b, g in zip(node.bodies, node.grow)]
+        if depth == 0 or max(lengths) >= WINNING_LENGTH:
+            return self._evaluate(node, lengths), None
+
+        # The controlled snake moves on even plies, the opponent on odd ones.
+        mover = self.me if ply % 2 == 0 else 1 - self.me
+        maximizing = mover == self.me
+        key = node.hash ^ (self.tables.z_side if ply % 2 else 0)
+        entry = self._lookup(key)
+        tt_move = None
+        if entry is not None:
+            e_depth, e_value, e_flag, tt_move = entry
+            if e_depth >= depth:
+                if e_flag == EXACT:
+                    return e_value, tt_move
+                if e_flag == LOWER:
+                    alpha = max(alpha, e_value)
+                elif e_flag == UPPER:
+                    beta = min(beta, e_value)
+                if alpha >= beta:
+                    return e_value, tt_move
+
+        moves = self._moves(node, mover)
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        alpha0, beta0 = alpha, beta
+        best_move = moves[0]
+        best = -np.inf if maximizing else np.inf
+        for d in moves:
+            child = advance(self.tables, node, mover, d, self.blocked)
+            if ply % 2:
+                child = resolve(self.tables, child)
+            value, _ = self._search(child, depth - 1, ply + 1, alpha, beta)
+            if maximizing:
+                if value > best:
+                    best, best_move = value, d
+                alpha = max(alpha, best)
+            else:
+                if value < best:
+                    best, best_move = value, d
+                beta = min(beta, best)
+            if alpha >= beta:
+                break
+
+        if best <= alpha0:
+            flag = UPPER
+        elif best >= beta0:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, (depth, best, flag, best_move))
+        return best, best_move
+
+    def _evaluate(self, node, lengths):
+        me, opp = self.me, 1 - self.me
+        if lengths[me] >= WINNING_LENGTH and lengths[me] >= lengths[opp]:
+            return WIN_SCORE
+        if lengths[opp] >= WINNING_LENGTH:
+            return -WIN_SCORE
+        score = 10.0 * (lengths[me] - lengths[opp]) + 2.0 * (node.boost[me] > 0) - 2.0 * (node.boost[opp] > 0)
+        score += self._food_pull(node, me) - self._food_pull(node, opp)
+        # Mobility: penalise heads with few open neighbours.
+        score += 0.5 * (self._mobility(node, me) - self._mobility(node, opp))
+        return score
+
+    def _food_pull(self, node, s):
+        hx, hy, hz = self.tables.coords(node.bodies[s][0])
+        food_coords = self.food_coords
+        best = 0.0
+        for cell, kind in node.foods:
+            fx, fy, fz = food_coords[cell]
+            dist = abs(fx - hx) + abs(fy - hy) + abs(fz - hz)
+            best = max(best, FOOD_VALUES[kind] / (1 + dist))
+        return 5.0 * best
+
+    def _mobility(self, node, s):
+        body, other = node.bodies[s], node.bodies[1 - s]
+        blocked = self.blocked
+        free = sum(1 for nxt in self.tables.neighbors(body[0])
+                   if nxt >= 0 and nxt not in body and nxt not in other and nxt not in blocked)
+        return free if free else -10
@@ -1,91 +1,236 @@
 # snake.py
 import random
 import numpy as np
-from math import pi, cos, sin
-from config import MIN_POS, MAX_POS, MAX_ITER
-from util import is_in_bounds, lerp_color
+from config import MAX_ITER, WINNING_LENGTH
+from util import lerp_colors
+from grid import EMPTY, OccupancyGrid
+from food import GREEN, ORANGE, PURPLE
+import kernels
+
+# A boosted snake can move three times in the tick it reaches WINNING_LENGTH - 1,
+# and move() pushes the new head before popping the tail.
+BODY_CAPACITY = WINNING_LENGTH + 4
+
+# Boosted body gradients start from these colors; other snakes fade from white.
+BOOST_COLORS = {(1, 0, 0): (1, 0, 1), (0, 0, 1): (0, 1, 1)}
+
+class SnakeBody:
+    """Read-only, head-first sequence view over a snake's ring buffer."""
+    __slots__ = ('_snake',)
+
+    def __init__(self, snake):
+        self._snake = snake
+
+    def __len__(self):
+        return self._snake._length
+
+    def __getitem__(self, i):
+        snake = self._snake
+        if isinstance(i, slice):
+            return self.array()[i]
+        n = snake._length
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("snake body index out of range")
+        buf = snake._buf
+        return buf[(snake._head + i) % len(buf)].copy()
+
+    def __iter__(self):
+        snake = self._snake
+        buf = snake._buf
+        cap = len(buf)
+        for i in range(snake._length):
+            yield buf[(snake._head + i) % cap]
+
+    def array(self):
+        """Return the body as a new (length, 3) array, head first."""
+        snake = self._snake
+        idx = (snake._head + np.arange(snake._length)) % len(snake._buf)
+        return snake._buf[idx]
 
 class Snake:
-    def __init__(self, color, start_pos):
+    __slots__ = ('color', 'grid', 'id', 'body', 'direction', 'grow_count', 'speed_boost_timer',
+                 'retries', 'rng', 'controller', 'resizable', '_buf', '_head', '_length')
+
+    def __init__(self, color, start_pos, grid=None, rng=None, controller=None):
         self.color = color  # For example: (1, 0, 0) for red or (0, 0, 1) for blue.
-        self.body = [np.array(start_pos)]
-        self.direction = np.array(random.choice([
+        # Optional AI with a choose(snake, other, foods) method; greedy steering otherwise.
+        self.controller = controller
+        # A random.Random for seeded matches; the module-level generator otherwise.
+        self.rng = rng if rng is not None else random
+        # Snakes in the same match must share one grid so they can see each other.
+        self.grid = grid if grid is not None else OccupancyGrid()
+        self.id = self.grid.register()
+        # The body lives in a fixed-size ring buffer; body[0] is _buf[_head].
+        # It grows past BODY_CAPACITY only while resizable (GameState binds it to its record).
+        self.resizable = True
+        self._buf = np.zeros((BODY_CAPACITY, 3), dtype=np.int32)
+        self._buf[0] = start_pos
+        self._head = 0
+        self._length = 1
+        self.body = SnakeBody(self)
+        self.grid.add(self._buf[0], self.id)
+        self.direction = np.array(self.rng.choice([
             [1, 0, 0], [-1, 0, 0],
             [0, 1, 0], [0, -1, 0],
             [0, 0, 1], [0, 0, -1]
         ]))
         self.grow_count = 0
         self.speed_boost_timer = 0
+        # How many times the last move re-steered around a wall or body (at most 2 * MAX_ITER).
+        self.retries = 0
+
+    def occupies(self, pos):
+        """Return True if any segment of this snake is at pos."""
+        return self.grid.owner_at(pos) == self.id
+
+    def blocked(self, pos):
+        """Return True if another snake occupies pos."""
+        owner = self.grid.owner_at(pos)
+        return owner != EMPTY and owner != self.id
 
     def move(self, other):
+        """Move one cell. other is the rival passed on to change_direction; every snake blocks.
+
+        Returns the step taken (all zeros if boxed in) and whether the snake grew.
+        """
+        grid = self.grid
         head = self.body[0]
         new_head = head + self.direction
         iter_count = 0
-        while not is_in_bounds(new_head, MIN_POS, MAX_POS) and iter_count < MAX_ITER:
+        while not grid.in_bounds(new_head) and iter_count < MAX_ITER:
             # If no food information is available, pass None.
-            self.change_direction(other, None, None, None)
+            self.change_direction(other, None)
             new_head = head + self.direction
             iter_count += 1
-        if not is_in_bounds(new_head, MIN_POS, MAX_POS):
+        if not grid.in_bounds(new_head):
             safe = [d for d in ([np.array([1, 0, 0]), np.array([-1, 0, 0]),
                                   np.array([0, 1, 0]), np.array([0, -1, 0]),
                                   np.array([0, 0, 1]), np.array([0, 0, -1])])
-                    if is_in_bounds(head + d, MIN_POS, MAX_POS)]
-            self.direction = random.choice(safe) if safe else np.array([0, 0, 0])
+                    if grid.in_bounds(head + d)]
+            self.direction = self.rng.choice(safe) if safe else np.array([0, 0, 0])
             new_head = head + self.direction
 
+        retries = iter_count
         iter_count = 0
-        while any(np.array_equal(new_head, seg) for seg in other.body) and iter_count < MAX_ITER:
-            self.change_direction(other, None, None, None)
+        while self.blocked(new_head) and iter_count < MAX_ITER:
+            self.change_direction(other, None)
             new_head = head + self.direction
             iter_count += 1
-        if any(np.array_equal(new_head, seg) for seg in other.body):
+        self.retries = retries + iter_count
+        step = self.direction
+        if self.blocked(new_head):
             new_head = head  # Fallback: do not move.
-        self.body.insert(0, new_head)
-        if self.grow_count > 0:
+            step = np.zeros(3, dtype=int)
+        grow = self.grow_count > 0
+        if grow:
             self.grow_count -= 1
-        else:
-            self.body.pop()
+        self.step_to(new_head, grow)
+        return step, grow
+
+    def step_to(self, new_head, grow=False):
+        """Push new_head and, unless growing, pop the tail, keeping the grid in sync."""
+        self._push_head(new_head)
+        self.grid.add(new_head, self.id)
+        if not grow:
+            self.grid.remove(self._pop_tail())
+
+    def set_body(self, segments):
+        """Replace the whole body (head first), e.g. when restoring a saved position."""
+        segments = np.asarray(segments, dtype=np.int32).reshape(-1, 3)
+        if len(segments) > len(self._buf):
+            self._check_resizable()
+        for seg in self.body:
+            self.grid.remove(seg)
+        if len(segments) > len(self._buf):
+            self._buf = np.zeros((len(segments), 3), dtype=np.int32)
+        self._buf[:len(segments)] = segments
+        self._head = 0
+        self._length = len(segments)
+        for seg in segments:
+            self.grid.add(seg, self.id)
+
+    def _push_head(self, pos):
+        cap = len(self._buf)
+        if self._length == cap:
+            # Only reachable if a snake outgrows BODY_CAPACITY; unroll and double.
+            self._check_resizable()
+            self._buf = np.concatenate([self.body.array(), np.zeros((cap, 3), dtype=np.int32)])
+            self._head = 0
+            cap *= 2
+        self._head = (self._head - 1) % cap
+        self._buf[self._head] = pos
+        self._length += 1
+
+    def _check_resizable(self):
+        if not self.resizable:
+            raise ValueError(f"Snake outgrew its {len(self._buf)}-segment body buffer, which is fixed in a GameState")
+
+    def _pop_tail(self):
+        self._length -= 1
+        return self._buf[(self._head + self._length) % len(self._buf)]
 
     def grow(self, amount=1):
         self.grow_count += amount
 
-    def change_direction(self, other, green_foods, orange_foods, purple_foods):
-        possible_directions = [np.array([1, 0, 0]), np.array([-1, 0, 0]),
-                               np.array([0, 1, 0]), np.array([0, -1, 0]),
-                               np.array([0, 0, 1]), np.array([0, 0, -1])]
+    def change_direction(self, other, foods):
+        """Steer toward food. foods is the match's FoodIndex, or None when no food information is available.
+
+        other is the rival snake, used for length comparisons; every snake's
+        cells are avoided through the grid.
+        """
+        if self.controller is not None and foods is not None:
+            direction = self.controller.choose(self, other, foods)
+            if direction is not None:
+                self.direction = direction
+            return
+        self.steer(other, foods)
+
+    def steer(self, other, foods):
+        """The built-in greedy steering, used when there is no controller.
+
+        The scoring loops run as compiled kernels when kernels.py has them.
+        """
+        if not kernels.loaded:
+            kernels.load()
         head = self.body[0]
+        grid = self.grid
+        possible_directions = None
+        if kernels.steer_normal is None:
+            possible_directions = [np.array([1, 0, 0]), np.array([-1, 0, 0]),
+                                   np.array([0, 1, 0]), np.array([0, -1, 0]),
+                                   np.array([0, 0, 1]), np.array([0, 0, -1])]
 
         # BOOST MODE: When speed boost is active, target food aggressively.
-        if self.speed_boost_timer > 0 and green_foods is not None:
-            target_food = None
-            if orange_foods:
-                target_food = min(orange_foods, key=lambda food: np.linalg.norm(food.position - head))
-            elif green_foods:
-                target_food = min(green_foods, key=lambda food: np.linalg.norm(food.position - head))
+        if self.speed_boost_timer > 0 and foods is not None:
+            target_food = foods.nearest(head, ORANGE)
+            if target_food is None:
+                target_food = foods.nearest(head, GREEN)
             if target_food is None:
                 return
+            if kernels.steer_boost is not None:
+                choice = kernels.steer_boost(grid.owner, grid.min_pos, grid.max_pos, head, target_food.position)
+                if choice >= 0:
+                    self.direction = kernels.DIRECTIONS[choice].copy()
+                return
             diff = target_food.position - head
             if np.linalg.norm(diff) == 0:
                 return
-            axes = np.argsort(-np.abs(diff))
+            axes = np.argsort(-np.abs(diff), kind='stable')
             chosen = None
             for axis in axes:
                 candidate = np.zeros(3, dtype=int)
                 candidate[axis] = 1 if diff[axis] > 0 else -1
                 new_pos = head + candidate
-                if not is_in_bounds(new_pos, MIN_POS, MAX_POS):
-                    continue
-                if any(np.array_equal(new_pos, seg) for seg in self.body[1:]):
-                    continue
-                if any(np.array_equal(new_pos, seg) for seg in other.body):
+                # new_pos is never the head itself, so any own segment there is body[1:].
+                if not grid.in_bounds(new_pos) or grid.owner_at(new_pos) != EMPTY:
                     continue
                 chosen = candidate
                 break
             if chosen is None:
-                safe_dirs = [d for d in possible_directions if is_in_bounds(head + d, MIN_POS, MAX_POS) and
-                             not any(np.array_equal(head + d, seg) for seg in self.body[1:]) and
-                             not any(np.array_equal(head + d, seg) for seg in other.body)]
+                safe_dirs = [d for d in possible_directions if grid.in_bounds(head + d) and
+                             grid.owner_at(head + d) == EMPTY]
                 if safe_dirs:
                     chosen = min(safe_dirs, key=lambda d: sum(abs(target_food.position - (head + d))))
             if chosen is not None:
@@ -94,15 +239,21 @@ class Snake:
 
         # NORMAL MODE: Select target based on food availability and snake lengths.
         target_food = None
-        if green_foods is not None:
-            if purple_foods and len(self.body) + 3 <= len(other.body):
-                target_food = min(purple_foods, key=lambda food: np.linalg.norm(food.position - head))
-            elif orange_foods:
-                target_food = min(orange_foods, key=lambda food: np.linalg.norm(food.position - head))
-            elif green_foods:
-                target_food = min(green_foods, key=lambda food: np.linalg.norm(food.position - head))
+        if foods is not None:
+            if len(self.body) + 3 <= len(other.body):
+                target_food = foods.nearest(head, PURPLE)
+            if target_food is None:
+                target_food = foods.nearest(head, ORANGE)
+            if target_food is None:
+                target_food = foods.nearest(head, GREEN)
         if target_food is None:
             return
+        if kernels.steer_normal is not None:
+            choice = kernels.steer_normal(grid.owner, grid.min_pos, grid.max_pos, head, self.direction,
+                                          target_food.position)
+            if choice >= 0:
+                self.direction = kernels.DIRECTIONS[choice].copy()
+            return
         vec_to_target = target_food.position - head
         distance = np.linalg.norm(vec_to_target)
         vec_to_target_norm = vec_to_target / distance if distance != 0 else vec_to_target
@@ -112,46 +263,40 @@ class Snake:
         best_score = -float('inf')
         for new_direction in possible_directions:
             new_position = head + new_direction
-            if any(np.linalg.norm(new_position - seg) < 0.5 for seg in self.body[1:]):
-                continue
-            if any(np.array_equal(new_position, seg) for seg in other.body):
+            # Cells are integer, so the old per-segment distance penalty only ever
+            # applied to occupied cells, which are skipped here anyway.
+            if grid.owner_at(new_position) != EMPTY:
                 continue
             penalty = 0 if distance < grab_threshold else (0 if np.array_equal(new_direction, self.direction) else 0.5)
             score = np.dot(new_direction, vec_to_target_norm) - penalty
-            for seg in self.body[1:]:
-                d = np.linalg.norm(new_position - seg)
-                if d < 1.0:
-                    score -= (1.0 - d)
             if score > best_score:
                 best_score = score
                 best_direction = new_direction
         self.direction = best_direction
 
-    def draw(self):
-        """Draw the snake using the sphere drawing function from graphics.py."""
-        from OpenGL.GL import glColor3f, glColor3fv, glPushMatrix, glTranslatef, glPopMatrix
-        # Choose head color based on the snake's primary color.
-        head_color = (0.5, 0, 0) if self.color == (1, 0, 0) else (0, 0, 0.5)
+    def head_color(self):
+        # The head is a darker shade of the snake's primary color.
+        return tuple(c * 0.5 for c in self.color)
+
+    def segment_colors(self):
+        """Per-segment RGB array, head first, with the boost gradient when boosted."""
+        n = len(self.body)
         if self.speed_boost_timer > 0:
-            boost_color = (1, 0, 1) if self.color == (1, 0, 0) else (0, 1, 1)
-            for i, segment in enumerate(self.body):
-                t = i / (len(self.body) - 1) if len(self.body) > 1 else 0
-                col = lerp_color(boost_color, self.color, t)
-                if i == 0:
-                    col = head_color
-                glColor3f(*col)
-                glPushMatrix()
-                glTranslatef(*segment)
-                # Import the sphere drawing function here to avoid circular imports.
-                from graphics import draw_sphere
-                draw_sphere(0.5 if i == 0 else 0.4)
-                glPopMatrix()
+            boost_color = BOOST_COLORS.get(tuple(self.color), (1, 1, 1))
+            t = np.arange(n) / (n - 1) if n > 1 else np.zeros(n)
+            colors = lerp_colors(boost_color, self.color, t)
         else:
-            for i, segment in enumerate(self.body):
-                col = head_color if i == 0 else self.color
-                glColor3fv(col)
-                glPushMatrix()
-                glTranslatef(*segment)
-                from graphics import draw_sphere
-                draw_sphere(0.5 if i == 0 else 0.4)
-                glPopMatrix()
+            colors = np.tile(np.asarray(self.color, dtype=np.float32), (n, 1))
+        colors[0] = self.head_color()
+        return colors
+
+    def segment_radii(self):
+        radii = np.full(len(self.body), 0.4, dtype=np.float32)
+        radii[0] = 0.5
+        return radii
+
+    def draw(self):
+        """Draw the snake as one batch of spheres via graphics.py."""
+        # Import graphics here to avoid circular imports.
+        from graphics import draw_snakes
+        draw_snakes([self])
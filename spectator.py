@@ -0,0 +1,309 @@
+# spectator.py
+"""Live match broadcasting over TCP.
+
+The server sends each spectator a hello (arena bounds), then a full snapshot,
+then one delta per tick. Deltas are the replay event encoding (head moves,
+food spawns and eats, boost pickups and a tick marker) and snapshots are
+replay keyframes, so a spectator is a ReplayPlayer fed from the network.
+
+Every message is framed as a type byte and a little-endian uint32 length.
+Each client has a bounded queue; a client that falls behind has its backlog
+dropped and is resynchronized with a fresh snapshot, so a slow screen never
+holds up the tick or the other spectators.
+
+    python spectator.py serve --seed 1 --port 8765
+    python spectator.py watch --port 8765
+"""
+import argparse
+import asyncio
+import struct
+import threading
+import time
+
+from config import MIN_POS, MAX_POS
+from replay import OP_END, OP_TICK, WINNERS, ReplayRecorder, ReplayPlayer, encode_keyframe, decode_keyframe
+
+DEFAULT_PORT = 8765
+MSG_HELLO, MSG_SNAPSHOT, MSG_DELTA = 0, 1, 2
+FRAME = struct.Struct('<BI')
+HELLO = struct.Struct('<hh')
+CLIENT_QUEUE = 64
+
+def frame(kind, payload):
+    return FRAME.pack(kind, len(payload)) + payload
+
+class DeltaEncoder(ReplayRecorder):
+    """GameState observer that hands each tick's events to a SpectatorServer.
+
+    Moves, spawns, eats and boosts are encoded by ReplayRecorder; instead of
+    keeping keyframes, a snapshot is encoded only when a client needs one.
+    """
+    def __init__(self, state, server):
+        if len(state.snakes) != 2:
+            raise ValueError("Spectating supports two-snake matches only")
+        self.state = state
+        self.server = server
+        self.events = bytearray()
+        server.publish(self._snapshot(), None, hello=HELLO.pack(state.grid.min_pos, state.grid.max_pos))
+
+    def _snapshot(self):
+        state = self.state
+        return encode_keyframe(state.ticks, state.snakes, state.foods)
+
+    def on_tick(self, state):
+        self.events.append(OP_TICK)
+        if state.winner is not None:
+            self.events += struct.pack('<BB', OP_END, WINNERS.index(state.winner))
+        delta = bytes(self.events)
+        self.events.clear()
+        final = state.winner is not None
+        snapshot = self._snapshot() if self.server.wants_snapshot or final else None
+        self.server.publish(snapshot, delta, final=final)
+
+class _Client:
+    __slots__ = ('writer', 'queue', 'needs_snapshot', 'dropped')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = asyncio.Queue(CLIENT_QUEUE)
+        self.needs_snapshot = True
+        self.dropped = 0
+
+class SpectatorServer:
+    """Asyncio TCP server fanning one match out to any number of spectators.
+
+    publish() may be called from any thread; the server runs on its own event
+    loop, either in a background thread (start_in_thread) or in the caller's
+    loop (serve).
+    """
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.clients = set()
+        self.wants_snapshot = False
+        self.hello = None
+        self.snapshot = None
+        self.finished = False
+        self.loop = None
+        self._server = None
+        self._ready = threading.Event()
+
+    async def serve(self):
+        """Start listening on the running loop; returns once the socket is bound."""
+        self.loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    def start_in_thread(self):
+        """Run the server on a daemon thread's event loop; returns once it is listening."""
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.serve())
+            loop.run_forever()
+        threading.Thread(target=run, name="spectator-server", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def publish(self, snapshot, delta, hello=None, final=False):
+        """Queue a tick for every client. Thread-safe; never blocks.
+
+        snapshot is the position after this tick (or None), delta the tick's
+        events. hello starts a new match; final marks its last tick.
+        """
+        if self.loop is None:
+            self._publish(snapshot, delta, hello, final)
+        else:
+            self.loop.call_soon_threadsafe(self._publish, snapshot, delta, hello, final)
+
+    def _publish(self, snapshot, delta, hello, final):
+        if hello is not None:
+            self.hello = frame(MSG_HELLO, hello)
+            self.finished = False
+            for client in self.clients:
+                self._send(client, self.hello)
+                client.needs_snapshot = True
+        self.finished = self.finished or final
+        if snapshot is not None:
+            self.snapshot = frame(MSG_SNAPSHOT, snapshot)
+        message = frame(MSG_DELTA, delta) if delta is not None else None
+        for client in self.clients:
+            if client.needs_snapshot:
+                if snapshot is None:
+                    continue
+                self._send(client, self.snapshot)
+                client.needs_snapshot = False
+            elif message is not None:
+                self._send(client, message)
+        self.wants_snapshot = any(client.needs_snapshot for client in self.clients)
+
+    def _send(self, client, message):
+        try:
+            client.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: drop the backlog and resync from the next snapshot.
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            client.needs_snapshot = True
+            client.dropped += 1
+            self.wants_snapshot = True
+
+    async def _handle(self, reader, writer):
+        client = _Client(writer)
+        if self.hello is not None:
+            client.queue.put_nowait(self.hello)
+            if self.finished:
+                # No more ticks are coming; the last snapshot is the final position.
+                client.queue.put_nowait(self.snapshot)
+                client.needs_snapshot = False
+        self.clients.add(client)
+        self.wants_snapshot = self.wants_snapshot or client.needs_snapshot
+        sender = asyncio.create_task(self._send_loop(client))
+        try:
+            # Spectators send nothing; this returns when they disconnect.
+            await reader.read()
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled when the server's loop shuts down.
+            pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            writer.close()
+
+    async def _send_loop(self, client):
+        writer = client.writer
+        try:
+            while True:
+                writer.write(await client.queue.get())
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def run_match(self, state, tick_rate=8.0):
+        """Step a headless match at tick_rate on this loop, broadcasting every tick."""
+        state.observers.append(DeltaEncoder(state, self))
+        interval = 1.0 / tick_rate
+        next_tick = time.perf_counter()
+        while state.step():
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+class SpectatorView(ReplayPlayer):
+    """A ReplayPlayer fed live from a server instead of a file."""
+    def __init__(self):
+        self.seed = None
+        self.keyframes = []
+        self.events = bytearray()
+        self.ready = False
+        # Replaced by the server's arena on hello.
+        self._create(MIN_POS, MAX_POS)
+
+    def apply(self, kind, payload):
+        if kind == MSG_HELLO:
+            self._create(*HELLO.unpack(payload))
+        elif kind == MSG_SNAPSHOT:
+            self.events = bytearray()
+            tick = decode_keyframe(payload)[0]
+            self._restore((tick, 0, payload))
+            self.ready = True
+        elif kind == MSG_DELTA and self.ready:
+            self.events += payload
+            while self._pos < len(self.events):
+                self.step()
+            del self.events[:self._pos]
+            self._pos = 0
+
+async def receive(view, host='127.0.0.1', port=DEFAULT_PORT, lock=None):
+    """Apply messages from the server to view until the connection closes."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+            payload = await reader.readexactly(length)
+            if lock is None:
+                view.apply(kind, payload)
+            else:
+                with lock:
+                    view.apply(kind, payload)
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+def watch(host, port):
+    """Render a live match in a window with the regular Snake.draw/Food.draw code."""
+    import pygame
+    from OpenGL.GL import glClear, glRotatef, GL_COLOR_BUFFER_BIT, GL_DEPTH_BUFFER_BIT
+    import graphics
+
+    view = SpectatorView()
+    lock = threading.Lock()
+    threading.Thread(target=lambda: asyncio.run(receive(view, host, port, lock)), daemon=True).start()
+    graphics.init_opengl()
+    graphics.compile_diamond()
+    arena_size = None
+    clock = pygame.time.Clock()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+        with lock:
+            # bounds_for(n) spans n - 1 cells; the hello may change it at any time.
+            size = view.grid.size + 1
+        if size != arena_size:
+            arena_size = size
+            graphics.setup_gl(graphics.viewport_size, arena_size)
+            graphics.compile_cube_list(arena_size)
+        glRotatef(0.2, 0, 1, 0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        graphics.draw_arena()
+        with lock:
+            for snake in view.snakes:
+                snake.draw()
+            for food in view.foods:
+                food.draw()
+        pygame.display.flip()
+        clock.tick(60)
+
+async def swarm(host, port, clients, seconds):
+    """Connect many headless spectators and report how far each one got."""
+    views = [SpectatorView() for _ in range(clients)]
+    tasks = [asyncio.create_task(receive(view, host, port)) for view in views]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    ticks = sorted(view.ticks for view in views)
+    print(f"{clients} clients: ticks min {ticks[0]} median {ticks[len(ticks) // 2]} max {ticks[-1]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast or watch live matches.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    serve = sub.add_parser('serve', help="run a headless match and broadcast it")
+    serve.add_argument('--seed', type=int, default=None)
+    serve.add_argument('--tick-rate', type=float, default=8.0)
+    for p in (serve, sub.add_parser('watch', help="watch a match in a window"),
+              sub.add_parser('swarm', help="connect many headless test spectators")):
+        p.add_argument('--host', default='127.0.0.1')
+        p.add_argument('--port', type=int, default=DEFAULT_PORT)
+    sub.choices['swarm'].add_argument('--clients', type=int, default=200)
+    sub.choices['swarm'].add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        from game import GameState
+        async def run():
+            server = SpectatorServer(args.host, args.port)
+            await server.serve()
+            print(f"Broadcasting on {args.host}:{server.port}")
+            await server.run_match(GameState(seed=args.seed), args.tick_rate)
+            # Keep serving the final position to late spectators.
+            await asyncio.Event().wait()
+        asyncio.run(run())
+    elif args.command == 'watch':
+        watch(args.host, args.port)
+    else:
+        asyncio.run(swarm(args.host, args.port, args.clients, args.seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# telemetry.py
+"""Per-tick match telemetry, streamed to chunked columnar .npy files.
+
+A TelemetrySink buffers rows in preallocated arrays, one per column. When
+chunk_rows rows have filled up, the buffers go to a background writer thread
+and recording carries on in a spare set, so the simulation never waits on
+the disk unless the writer falls a whole queue behind. Each chunk is a
+directory with one .npy file per column, renamed into place only once it is
+complete, and named after its run, part and number, so several runs can
+share a directory:
+
+    DIR/ticks/<run>_<part>_<chunk>/head.npy
+    DIR/events/<run>_<part>_<chunk>/position.npy
+
+The ticks table has a row per snake per tick; the events table a row per
+food spawn, food eaten and boost pickup. TelemetryRecorder is the GameState
+observer that fills them:
+
+    sink = TelemetrySink('telemetry')
+    for seed in range(1000):
+        state = GameState(seed=seed)
+        state.observers.append(TelemetryRecorder(sink, state, match=seed))
+        while state.step():
+            pass
+    sink.close()
+
+TelemetryReader memory-maps the chunks back, one at a time or by column:
+
+    reader = TelemetryReader('telemetry')
+    for chunk in reader.chunks('ticks'):
+        retries = chunk['retries']
+    lengths = reader.column('ticks', 'length')
+
+tournament.py --telemetry DIR records every match it plays, and
+python telemetry.py DIR prints a summary.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from food import FOOD_COLORS
+
+# Column name -> (dtype, shape of one row's cell).
+TICK_COLUMNS = {
+    'match': (np.int32, ()),
+    'tick': (np.int32, ()),
+    'snake': (np.int8, ()),
+    'head': (np.int16, (3,)),
+    'length': (np.int16, ()),
+    'turns': (np.int8, ()),      # moves this tick that changed direction
+    'retries': (np.int16, ()),   # re-steers around walls and bodies (Snake.retries) this tick
+    'boost': (np.int8, ()),      # speed boost ticks left
+    'eaten': (np.int16, (len(FOOD_COLORS),)),   # food eaten so far in the match, by kind
+}
+EVENT_COLUMNS = {
+    'match': (np.int32, ()),
+    'tick': (np.int32, ()),
+    'event': (np.int8, ()),
+    'kind': (np.int8, ()),       # food kind; -1 for boosts
+    'snake': (np.int8, ()),      # the boosted snake; -1 for food events
+    'position': (np.int16, (3,)),
+}
+TABLES = {'ticks': TICK_COLUMNS, 'events': EVENT_COLUMNS}
+EVENT_SPAWN, EVENT_EAT, EVENT_BOOST = 0, 1, 2
+
+CHUNK_ROWS = 1 << 16
+# Full chunks that may wait for the writer before recording blocks.
+QUEUE_DEPTH = 4
+
+class Table:
+    """Preallocated column buffers for one table, handed to the writer chunk by chunk."""
+    def __init__(self, sink, name, columns):
+        self.sink = sink
+        self.name = name
+        self.columns = columns
+        self.chunks = 0
+        self.rows = 0
+        self._spare = queue.SimpleQueue()
+        self.buffers = self._allocate()
+
+    def _allocate(self):
+        n = self.sink.chunk_rows
+        return {name: np.zeros((n,) + shape, dtype=dtype) for name, (dtype, shape) in self.columns.items()}
+
+    def reserve(self, n):
+        """Index of the first of n free rows in the current chunk, handing it to the writer first if they do not fit."""
+        if self.rows + n > self.sink.chunk_rows:
+            self.flush()
+        self.rows += n
+        return self.rows - n
+
+    def flush(self):
+        if not self.rows:
+            return
+        self.sink.submit(self, self.chunks, self.buffers, self.rows)
+        self.chunks += 1
+        self.rows = 0
+        try:
+            self.buffers = self._spare.get_nowait()
+        except queue.Empty:
+            self.buffers = self._allocate()
+
+    def recycle(self, buffers):
+        self._spare.put(buffers)
+
+class TelemetrySink:
+    """Chunked columnar telemetry written to directory by a background thread.
+
+    run identifies one recording session (by default, the time it started)
+    and part tells apart sinks of the same run writing into the same
+    directory (one per worker process, say). Both go into the chunk names,
+    so chunks read back by run, then part, then recording order.
+    """
+    def __init__(self, directory, chunk_rows=CHUNK_ROWS, part=0, queue_depth=QUEUE_DEPTH, run=None):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.part = part
+        self.run = time.time_ns() if run is None else run
+        for name in TABLES:
+            os.makedirs(os.path.join(directory, name), exist_ok=True)
+        self.tables = {name: Table(self, name, columns) for name, columns in TABLES.items()}
+        self.ticks = self.tables['ticks']
+        self.events = self.tables['events']
+        self._queue = queue.Queue(queue_depth)
+        self._error = None
+        self._writer = threading.Thread(target=self._write, name="snake-telemetry", daemon=True)
+        self._writer.start()
+
+    def submit(self, table, index, buffers, rows):
+        if self._error is not None:
+            raise self._error
+        self._queue.put((table, index, buffers, rows))
+
+    def _write(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            table, index, buffers, rows = item
+            # Any failure is kept for the recording thread to raise; the writer
+            # carries on draining the queue so that submit() never blocks on it.
+            try:
+                if self._error is None:
+                    self._write_chunk(table, index, buffers, rows)
+            except Exception as error:
+                self._error = error
+            finally:
+                table.recycle(buffers)
+
+    def _write_chunk(self, table, index, buffers, rows):
+        name = f"{self.run}_{self.part}_{index}"
+        final = os.path.join(self.directory, table.name, name)
+        partial = final + '.tmp'
+        os.makedirs(partial, exist_ok=True)
+        for column, values in buffers.items():
+            np.save(os.path.join(partial, column + '.npy'), values[:rows])
+        # Readers only ever see complete chunks.
+        os.replace(partial, final)
+
+    def close(self):
+        """Write out the partly filled chunks and wait for the writer to finish."""
+        for table in self.tables.values():
+            table.flush()
+        self._queue.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TelemetryRecorder:
+    """GameState observer that records one match into a TelemetrySink.
+
+    Food already on the board is recorded as spawned on the tick the
+    recorder is attached.
+    """
+    def __init__(self, sink, state, match=0):
+        self.sink = sink
+        self.state = state
+        self.match = match
+        n = len(state.snakes)
+        self._ids = list(range(n))
+        self._turns = [0] * n
+        self._retries = [0] * n
+        self._last = [snake.direction for snake in state.snakes]
+        for food in state.foods:
+            self.on_spawn(food)
+
+    def _event(self, event, kind, snake, position):
+        events = self.sink.events
+        i = events.reserve(1)
+        columns = events.buffers
+        columns['match'][i] = self.match
+        columns['tick'][i] = self.state.ticks
+        columns['event'][i] = event
+        columns['kind'][i] = kind
+        columns['snake'][i] = snake
+        columns['position'][i] = position
+
+    def on_move(self, snake, delta, grew):
+        i = snake.id
+        last = self._last[i]
+        # delta is usually the snake's direction array itself, so identity settles most moves.
+        if delta is not last and (delta != last).any() and delta.any():
+            self._turns[i] += 1
+            self._last[i] = delta
+        self._retries[i] += snake.retries
+
+    def on_spawn(self, food):
+        self._event(EVENT_SPAWN, food.kind, -1, food.position)
+
+    def on_eat(self, index, food):
+        self._event(EVENT_EAT, food.kind, -1, food.position)
+
+    def on_boost(self, snake):
+        self._event(EVENT_BOOST, -1, snake.id, snake.body[0])
+
+    def on_tick(self, state):
+        snakes = state.snakes
+        ticks = self.sink.ticks
+        start = ticks.reserve(len(snakes))
+        stop = start + len(snakes)
+        columns = ticks.buffers
+        columns['match'][start:stop] = self.match
+        columns['tick'][start:stop] = state.ticks
+        columns['snake'][start:stop] = self._ids
+        columns['head'][start:stop] = [snake.body[0] for snake in snakes]
+        columns['length'][start:stop] = [len(snake.body) for snake in snakes]
+        columns['turns'][start:stop] = self._turns
+        columns['retries'][start:stop] = self._retries
+        columns['boost'][start:stop] = [snake.speed_boost_timer for snake in snakes]
+        columns['eaten'][start:stop].T[:] = list(state.food_eaten.values())
+        self._turns = [0] * len(snakes)
+        self._retries = [0] * len(snakes)
+
+class TelemetryReader:
+    """Lazy access to a telemetry directory; chunks are memory-mapped, not read."""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def chunk_names(self, table):
+        """Names of table's complete chunks, in order; safe to call while a sink is still writing."""
+        path = os.path.join(self.directory, table)
+        if not os.path.isdir(path):
+            return []
+        names = [name for name in os.listdir(path) if not name.endswith('.tmp')]
+        # Numerically, by run, part and chunk number: parts (seeds) may be negative.
+        return sorted(names, key=lambda name: tuple(int(field) for field in name.split('_')))
+
+    def load(self, table, name, columns=None, mmap=True):
+        """One chunk as {column: array}, memory-mapped read-only unless mmap is False."""
+        path = os.path.join(self.directory, table, name)
+        mode = 'r' if mmap else None
+        return {column: np.load(os.path.join(path, column + '.npy'), mmap_mode=mode)
+                for column in (columns or TABLES[table])}
+
+    def chunks(self, table, columns=None, mmap=True):
+        """Yield each chunk of table in turn, as load() returns it."""
+        for name in self.chunk_names(table):
+            yield self.load(table, name, columns, mmap)
+
+    def column(self, table, column):
+        """One column of the whole table, concatenated into memory."""
+        parts = [chunk[column] for chunk in self.chunks(table, (column,))]
+        if not parts:
+            dtype, shape = TABLES[table][column]
+            return np.zeros((0,) + shape, dtype=dtype)
+        return np.concatenate(parts)
+
+    def rows(self, table):
+        return sum(len(chunk[next(iter(TABLES[table]))]) for chunk in self.chunks(table))
+
+def summarize(directory):
+    """Print row counts and a few aggregates from a telemetry directory."""
+    reader = TelemetryReader(directory)
+    matches = set()
+    rows = turns = retries = boosted = 0
+    for chunk in reader.chunks('ticks', ('match', 'turns', 'retries', 'boost')):
+        rows += len(chunk['match'])
+        matches.update(np.unique(chunk['match']).tolist())
+        turns += int(chunk['turns'].sum())
+        retries += int(chunk['retries'].sum())
+        boosted += int(np.count_nonzero(chunk['boost']))
+    counts = np.zeros(3, dtype=np.int64)
+    for chunk in reader.chunks('events', ('event',)):
+        counts += np.bincount(chunk['event'], minlength=3)
+    print(f"{len(matches)} matches, {rows} snake-ticks in {len(reader.chunk_names('ticks'))} chunks")
+    print(f"turns {turns}, retries {retries}, boosted snake-ticks {boosted}")
+    print(f"food spawned {counts[EVENT_SPAWN]}, eaten {counts[EVENT_EAT]}, boosts {counts[EVENT_BOOST]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a telemetry directory written by tournament.py --telemetry.")
+    parser.add_argument('directory')
+    summarize(parser.parse_args().directory)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# test_kernels.py
+"""The compiled steering kernels must play exactly like Snake.steer's pure-Python loops.
+
+Without Numba the kernels are checked uncompiled, so the logic is still covered.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import kernels
+
+@pytest.mark.parametrize('num_snakes', [2, 4])
+def test_matches_identical_with_and_without_kernels(num_snakes):
+    assert kernels.parity(range(10), 3000, num_snakes) == []
+
+def test_jit_off_does_not_import_numba():
+    env = dict(os.environ, SNAKE_JIT='0')
+    code = ("import sys, game; game.GameState(seed=1).step(); "
+            "print('numba' in sys.modules)")
+    out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert out.stdout.strip() == 'False'
+
+def test_importing_game_does_not_import_numba():
+    code = "import sys, game; print('numba' in sys.modules)"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert out.stdout.strip() == 'False'
@@ -0,0 +1,122 @@
+# tournament.py
+"""Run seeded headless matches across CPU cores and report aggregate results.
+
+    python tournament.py --matches 1000 --seed 0 --workers 8
+
+Match i uses seed (--seed + i), so the same arguments always give the same
+report regardless of --workers. With --telemetry DIR, per-tick telemetry of
+every match is written there as well (see telemetry.py).
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import MAX_TICKS
+from game import AI_NAMES, GameState
+from telemetry import TelemetryRecorder, TelemetrySink
+
+def play_match(seed, max_ticks=MAX_TICKS, ai=('greedy', 'greedy'), telemetry=None):
+    """Play one headless match and return its result as a plain dict.
+
+    telemetry is an optional TelemetrySink to record the match into.
+    """
+    state = GameState(seed=seed, ai=ai)
+    if telemetry is not None:
+        state.observers.append(TelemetryRecorder(telemetry, state, match=seed))
+    while state.ticks < max_ticks and state.step():
+        pass
+    if state.winner is None:
+        winner = None
+    else:
+        winner = 'red' if state.winner.startswith("Red") else 'blue'
+    return {
+        'seed': seed,
+        'winner': winner,
+        'ticks': state.ticks,
+        'lengths': [len(state.snake1.body), len(state.snake2.body)],
+        'food_eaten': {kind: list(counts) for kind, counts in state.food_eaten.items()},
+        'boost_ticks': list(state.boost_ticks),
+    }
+
+def aggregate(results):
+    """Combine per-match results (in seed order) into a summary report."""
+    n = len(results)
+    ticks = [r['ticks'] for r in results]
+    wins = {'red': 0, 'blue': 0, None: 0}
+    food = {'green': [0, 0], 'orange': [0, 0], 'purple': [0, 0]}
+    boost_ticks = [0, 0]
+    for r in results:
+        wins[r['winner']] += 1
+        for kind, counts in r['food_eaten'].items():
+            food[kind][0] += counts[0]
+            food[kind][1] += counts[1]
+        boost_ticks[0] += r['boost_ticks'][0]
+        boost_ticks[1] += r['boost_ticks'][1]
+    return {
+        'matches': n,
+        'red_win_rate': wins['red'] / n if n else 0.0,
+        'blue_win_rate': wins['blue'] / n if n else 0.0,
+        'draws': wins[None],
+        'ticks': {
+            'mean': statistics.fmean(ticks) if ticks else 0.0,
+            'median': statistics.median(ticks) if ticks else 0,
+            'min': min(ticks, default=0),
+            'max': max(ticks, default=0),
+        },
+        'food_eaten': {kind: {'red': c[0], 'blue': c[1]} for kind, c in food.items()},
+        'boost_ticks': {'red': boost_ticks[0], 'blue': boost_ticks[1]},
+    }
+
+def play_batch(seeds, max_ticks, ai, telemetry, run):
+    """Play a match per seed, recording them into one sink of run in the telemetry directory."""
+    with TelemetrySink(telemetry, part=seeds[0], run=run) as sink:
+        return [play_match(seed, max_ticks, ai, sink) for seed in seeds]
+
+def run_matches(seeds, workers=None, max_ticks=MAX_TICKS, ai=('greedy', 'greedy'), telemetry=None):
+    """Play a match per seed and return the per-match results in seed order.
+
+    telemetry is an optional directory to write every match's telemetry to.
+    """
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    # Every batch's chunks carry this run's id, so reruns into the same directory add to it.
+    run = time.time_ns()
+    if workers == 1:
+        if telemetry is not None:
+            return play_batch(seeds, max_ticks, ai, telemetry, run) if seeds else []
+        return [play_match(seed, max_ticks, ai) for seed in seeds]
+    # Matches are independent and cheap to describe, so batch several per task
+    # to keep inter-process overhead small.
+    chunksize = max(1, len(seeds) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if telemetry is not None:
+            # Each batch gets its own sink, so its chunks are written by the worker that played it.
+            batches = [seeds[i:i + chunksize] for i in range(0, len(seeds), chunksize)]
+            n = len(batches)
+            results = pool.map(play_batch, batches, [max_ticks] * n, [ai] * n, [telemetry] * n, [run] * n)
+            return [result for batch in results for result in batch]
+        n = len(seeds)
+        return list(pool.map(play_match, seeds, [max_ticks] * n, [ai] * n, chunksize=chunksize))
+
+def run_tournament(seeds, workers=None, max_ticks=MAX_TICKS, ai=('greedy', 'greedy'), telemetry=None):
+    return aggregate(run_matches(seeds, workers, max_ticks, ai, telemetry))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded headless AI-vs-AI matches.")
+    parser.add_argument('--matches', type=int, default=100, help="number of matches to play")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first match")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS, help="ticks before a match is a draw")
+    parser.add_argument('--red-ai', choices=AI_NAMES, default='greedy', help="AI for the red snake")
+    parser.add_argument('--blue-ai', choices=AI_NAMES, default='greedy', help="AI for the blue snake")
+    parser.add_argument('--telemetry', metavar='DIR', help="write per-tick telemetry of every match to DIR")
+    args = parser.parse_args()
+    seeds = range(args.seed, args.seed + args.matches)
+    ai = (args.red_ai, args.blue_ai)
+    print(json.dumps(run_tournament(seeds, args.workers, args.max_ticks, ai, args.telemetry), indent=2))
+
+if __name__ == "__main__":
+    main()
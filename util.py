@@ -1,4 +1,6 @@
 # util.py
+import numpy as np
+
 def is_in_bounds(pos, min_pos, max_pos):
     """Return True if all coordinates of pos are between min_pos and max_pos."""
     return all(min_pos <= pos[i] <= max_pos for i in range(3))
@@ -8,3 +10,8 @@ def lerp_color(c1, c2, t):
     return (c1[0] * (1 - t) + c2[0] * t,
             c1[1] * (1 - t) + c2[1] * t,
             c1[2] * (1 - t) + c2[2] * t)
+
+def lerp_colors(c1, c2, t):
+    """Vectorized lerp_color: one RGB row per value in the array t."""
+    t = np.asarray(t, dtype=np.float32)[:, None]
+    return np.asarray(c1, dtype=np.float32) * (1 - t) + np.asarray(c2, dtype=np.float32) * t